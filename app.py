@@ -1,82 +1,133 @@
 import streamlit as st
-import os
-from src.parser import DocumentParser
-from src.image_extractor import ImageExtractor
-from src.gemini_api import GeminiProcessor
-from src.ppt_generator import PPTGenerator
+import time
+from src.jobs import JobQueueFull, get_job_queue
+from src.cache import get_default_cache, get_default_response_cache
+from src.scheduler import get_scheduler
+
+# Seconds between status checks while a job is running
+POLL_INTERVAL = 1.0
+
+STAGE_LABELS = {
+    "analyze": "Reading the document and extracting images",
+    "clean": "Cleaning up the text",
+    "llm": "Generating slides with AI",
+    "render": "Building the presentation"
+}
+
+@st.cache_resource
+def get_resources():
+    """Build the job queue and its pipeline once per server process instead of on every rerun"""
+    job_queue = get_job_queue()
+    job_queue.warm()
+    return job_queue
 
 def main():
     st.title("Document to Presentation Converter")
-    
+
     # File upload
     uploaded_file = st.file_uploader("Upload your document", type=['pdf', 'docx', 'txt'])
-    
+
     # User preferences
     target_audience = st.selectbox(
         "Select target audience",
         ["General", "Executive", "Technical"]
     )
-    
+
     tone = st.selectbox(
         "Select presentation tone",
         ["Formal", "Friendly", "Concise"]
     )
-    
+
     custom_instructions = st.text_area(
         "Additional instructions (optional)",
         "Example: Focus on key metrics and include charts"
     )
-    
+
+    refresh_cache = st.checkbox("Regenerate slides (ignore cached AI response)")
+
+    try:
+        job_queue = get_resources()
+    except Exception as e:
+        # e.g. GEMINI_API_KEY is not set; nothing is cached, so the next rerun tries again
+        st.error(f"An error occurred: {str(e)}")
+        return
+
     if uploaded_file and st.button("Generate Presentation"):
-        with st.spinner("Processing your document..."):
-            # Save uploaded file temporarily
-            temp_path = os.path.join("extracted", uploaded_file.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            try:
-                # Parse document
-                parser = DocumentParser()
-                text_content = parser.parse(temp_path)
-                
-                # Extract images
-                image_extractor = ImageExtractor()
-                images = image_extractor.extract(temp_path)
-                
-                # Process with Gemini
-                gemini = GeminiProcessor()
-                slides_content = gemini.process(
-                    text_content,
-                    target_audience,
-                    tone,
-                    custom_instructions
-                )
-                
-                # Generate PPT
-                ppt_gen = PPTGenerator()
-                output_path = os.path.join("output", "presentation.pptx")
-                ppt_gen.generate(slides_content, images, output_path)
-                
-                # Provide download link
-                with open(output_path, "rb") as f:
-                    st.download_button(
-                        "Download Presentation",
-                        f,
-                        file_name="presentation.pptx",
-                        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                    )
-                
-                # Optional: Show Gemini response in sidebar
-                with st.sidebar:
-                    st.subheader("AI Processing Details")
-                    st.json(slides_content)
-                    
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-            finally:
-                # Cleanup
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+        # The conversion runs on the shared worker pool; this session only keeps the job ID.
+        # Identical uploads and options map to the finished job, so repeat clicks are free.
+        try:
+            st.session_state["job_id"] = job_queue.submit(
+                uploaded_file.name,
+                uploaded_file.getbuffer(),
+                target_audience,
+                tone,
+                custom_instructions,
+                refresh_cache=refresh_cache
+            )
+        except JobQueueFull as e:
+            st.error(f"The converter is busy: {str(e)}")
+
+    job_id = st.session_state.get("job_id")
+    if job_id:
+        show_job(job_queue, job_id)
+
+def show_job(job_queue, job_id):
+    """Render the job's progress, polling until it finishes, then offer the deck"""
+    status = job_queue.status(job_id)
+    if status is None:
+        st.warning("This presentation has expired, please generate it again.")
+        del st.session_state["job_id"]
+        return
+
+    if status["state"] == "queued":
+        st.info(f"Waiting for a free worker (position {status['queue_position']} in the queue)...")
+    elif status["state"] == "running":
+        st.info(f"{STAGE_LABELS.get(status['stage'], 'Starting')}...")
+        if status["last_slide"]:
+            st.markdown(f"Generated slide {status['slides_generated']}: **{status['last_slide']}**")
+    elif status["state"] == "failed":
+        st.error(f"An error occurred: {status['error']}")
+        return
+
+    if status["state"] != "done":
+        # Rerun the script to poll again; the job keeps running between reruns
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+
+    finished = job_queue.result(job_id)
+    if finished is None:
+        # Expired between the status check and now
+        st.warning("This presentation has expired, please generate it again.")
+        del st.session_state["job_id"]
+        return
+    deck, result = finished
+
+    # Provide download link
+    st.download_button(
+        "Download Presentation",
+        bytes(deck),
+        file_name="presentation.pptx",
+        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    )
+
+    # Optional: Show Gemini response in sidebar
+    with st.sidebar:
+        st.subheader("AI Processing Details")
+        st.json(result["slides"])
+        st.subheader("Stage Timings (seconds)")
+        st.json(result["timings"])
+        st.subheader("Prompt Reduction")
+        st.json(result["cleaning"])
+        st.subheader("Document Cache")
+        st.json(get_default_cache().stats())
+        st.subheader("AI Response Cache")
+        st.json(get_default_response_cache().stats())
+        st.subheader("LLM Scheduler")
+        st.json(get_scheduler().metrics())
+        st.subheader("Job Queue")
+        st.json(job_queue.metrics())
+        st.subheader("Image Optimization")
+        st.json(result["images"])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,62 @@
+"""Compare per-image paragraph scans with the indexed DOCX image-context lookup.
+
+Usage: python benchmarks/bench_docx_context.py [--paragraphs 6000] [--images 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import build_docx
+from src.image_extractor import ImageExtractor
+
+
+def legacy_lookup(doc, image_rels):
+    """The previous lookup: up to three paragraph scans with XML serialisation per image"""
+    found = {}
+    for _, rel in image_rels:
+        for _ in range(3):
+            for para_idx, para in enumerate(doc.paragraphs):
+                if rel.target_ref in para._element.xml:
+                    found[rel.rId] = para_idx
+                    break
+    return found
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--paragraphs", type=int, default=6000)
+    arg_parser.add_argument("--images", type=int, default=100)
+    args = arg_parser.parse_args()
+
+    extractor = ImageExtractor()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.docx")
+        build_docx(path, args.paragraphs, args.images, image_size=(200, 150), caption_density=1.0)
+        doc = Document(path)
+
+    paragraphs = doc.paragraphs
+    image_rels = [(i, rel) for i, rel in enumerate(doc.part._rels.values()) if "image" in rel.target_ref]
+
+    start = time.perf_counter()
+    legacy_lookup(doc, image_rels)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = extractor._index_docx_references(paragraphs, image_rels)
+    indexed_time = time.perf_counter() - start
+
+    located = sum(1 for _, rel in image_rels if rel.rId in index)
+    print(f"paragraphs: {len(paragraphs)}, images: {len(image_rels)}, located: {located}")
+    print(f"legacy scan:   {legacy_time:.3f}s")
+    print(f"indexed walk:  {indexed_time:.3f}s")
+    print(f"speedup:       {legacy_time / indexed_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare the SequenceMatcher image matcher with the TF-IDF ImageMatcher.
+
+Usage: python benchmarks/bench_image_matching.py [--slides 40] [--images 150]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import TOPICS
+from src.image_matcher import ImageMatcher, MATCH_KEYWORDS, KEYWORD_BONUS
+from src.ppt_generator import PPTGenerator
+
+
+def build_inputs(slide_count, image_count, seed=7):
+    """Synthetic slides and image contexts sharing a topic vocabulary"""
+    rng = random.Random(seed)
+
+    def sentence(words):
+        return " ".join(rng.choice(TOPICS + MATCH_KEYWORDS) for _ in range(words))
+
+    images = [{"path": f"img{i}.png", "context": sentence(25)} for i in range(image_count)]
+    slides = [{"title": sentence(4), "bullets": [sentence(10) for _ in range(4)]} for _ in range(slide_count)]
+    return slides, images
+
+
+def legacy_scores(slide_context, images):
+    """Per-image scores from the previous difflib-based matcher"""
+    scores = []
+    for image in images:
+        context = (image.get("context") or "").lower()
+        similarity = SequenceMatcher(None, slide_context, context).ratio() if slide_context and context else 0
+        for keyword in MATCH_KEYWORDS:
+            if keyword in slide_context and keyword in context:
+                similarity += KEYWORD_BONUS
+        scores.append(similarity)
+    return scores
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--slides", type=int, default=40)
+    arg_parser.add_argument("--images", type=int, default=150)
+    args = arg_parser.parse_args()
+
+    slides, images = build_inputs(args.slides, args.images)
+    generator = PPTGenerator()
+    contexts = [generator._slide_context(slide["title"], slide["bullets"]) for slide in slides]
+
+    start = time.perf_counter()
+    legacy_best = []
+    for context in contexts:
+        scores = legacy_scores(context, images)
+        legacy_best.append(max(range(len(images)), key=scores.__getitem__))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = ImageMatcher(images).score(contexts)
+    indexed_best = list(matrix.argmax(axis=1))
+    indexed_time = time.perf_counter() - start
+
+    agreement = sum(a == b for a, b in zip(legacy_best, indexed_best)) / len(slides)
+    print(f"slides: {args.slides}, images: {args.images}")
+    print(f"SequenceMatcher: {legacy_time:.3f}s")
+    print(f"TF-IDF index:    {indexed_time:.4f}s")
+    print(f"speedup:         {legacy_time / indexed_time:.0f}x")
+    print(f"same top image:  {agreement:.0%}")
+
+
+if __name__ == "__main__":
+    main()
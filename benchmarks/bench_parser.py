@@ -0,0 +1,52 @@
+"""Compare serial and multi-process PDF text extraction in DocumentParser.
+
+Usage: python benchmarks/bench_parser.py [--pages 2000] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import build_pdf
+from src.parser import DocumentParser
+
+
+def time_parse(parser, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = parser.parse(path)
+        best = min(best, time.perf_counter() - start)
+    return best, text
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--pages", type=int, default=2000)
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.pdf")
+        build_pdf(path, args.pages, paragraphs_per_page=10)
+
+        serial_time, serial_text = time_parse(DocumentParser(workers=1), path, args.repeat)
+        parallel_parser = DocumentParser(workers=args.workers, parallel_threshold=1)
+        parallel_time, parallel_text = time_parse(parallel_parser, path, args.repeat)
+        parallel_parser.close()
+
+    if serial_text != parallel_text:
+        raise SystemExit("Parallel output differs from serial output")
+
+    print(f"pages:    {args.pages}")
+    print(f"serial:   {serial_time:.3f}s ({args.pages / serial_time:.0f} pages/s)")
+    print(f"parallel: {parallel_time:.3f}s ({args.pages / parallel_time:.0f} pages/s, {args.workers} workers)")
+    print(f"speedup:  {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
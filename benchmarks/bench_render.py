@@ -0,0 +1,39 @@
+"""Compare slides per second for the python-pptx and bulk XML rendering paths.
+
+Usage: python benchmarks/bench_render.py [--sizes 50 500 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import build_slides
+from src.ppt_generator import PPTGenerator
+
+
+def time_generate(slides, fast_render, output_path):
+    generator = PPTGenerator(fast_render=fast_render)
+    start = time.perf_counter()
+    generator.generate(slides, [], output_path)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    args = arg_parser.parse_args()
+
+    print(f"{'slides':>7} {'api s/s':>10} {'bulk s/s':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            slides = build_slides(size)
+            api_time = time_generate(slides, False, os.path.join(tmp_dir, "api.pptx"))
+            bulk_time = time_generate(slides, True, os.path.join(tmp_dir, "bulk.pptx"))
+            print(f"{size:>7} {size / api_time:>10.0f} {size / bulk_time:>10.0f} {api_time / bulk_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
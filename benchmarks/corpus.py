@@ -0,0 +1,126 @@
+"""Synthetic PDF, DOCX and TXT documents and slide lists for the benchmarks.
+
+Usage: python benchmarks/corpus.py OUTPUT_DIR [--pages 50] [--images-per-page 1] [--paragraphs 1000]
+"""
+import argparse
+import io
+import os
+import random
+
+import fitz
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+TOPICS = ["revenue", "growth", "market", "customer", "pipeline", "forecast", "margin", "churn",
+          "region", "product", "pricing", "retention", "hiring", "cost", "latency", "quality"]
+CHART_WORDS = ["chart", "graph", "diagram", "figure", "table", "plot", "trend", "comparison"]
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(TOPICS + CHART_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def image_bytes(rng, size, fmt="PNG"):
+    """Return an encoded image with a few coloured bands, so it compresses like a simple chart"""
+    width, height = size
+    image = Image.new("RGB", size, (255, 255, 255))
+    bands = rng.randint(3, 8)
+    for band in range(bands):
+        colour = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        top = height * band // bands
+        image.paste(colour, (width // 8, top, width * (band + 2) // (bands + 2), top + height // (bands * 2) + 1))
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def build_pdf(path, pages, images_per_page=0, image_size=(800, 600), caption_density=0.5,
+              paragraphs_per_page=6, seed=7):
+    """Write a synthetic PDF; caption_density is the share of images given a "Figure N:" caption"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    figure_num = 0
+    for page_num in range(pages):
+        page = doc.new_page()
+        margin = 50
+        body = [f"Section {page_num + 1}: {sentence(rng, 4)}"]
+        body += [" ".join(sentence(rng, 12) for _ in range(4)) for _ in range(paragraphs_per_page)]
+
+        # Images are stacked in the lower half of the page, with the text above them
+        image_top = page.rect.height / 2 if images_per_page else page.rect.height - margin
+        page.insert_textbox(fitz.Rect(margin, margin, page.rect.width - margin, image_top - 10),
+                            "\n".join(body), fontsize=8)
+
+        slot_height = (page.rect.height / 2 - margin) / max(images_per_page, 1)
+        for img_index in range(images_per_page):
+            figure_num += 1
+            top = image_top + img_index * slot_height
+            rect = fitz.Rect(margin, top, page.rect.width / 2, top + slot_height - 14)
+            page.insert_image(rect, stream=image_bytes(rng, image_size))
+            if rng.random() < caption_density:
+                caption = f"Figure {figure_num}: {sentence(rng, 5)}"
+                page.insert_text((page.rect.width / 2 + 10, top + slot_height / 2), caption, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def build_docx(path, paragraphs, images=0, image_size=(800, 600), caption_density=0.5, seed=7):
+    """Write a synthetic DOCX with images spread evenly through the body"""
+    rng = random.Random(seed)
+    doc = Document()
+    every = max(1, paragraphs // max(images, 1))
+    image_num = 0
+    for para_num in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {para_num}. " + sentence(rng, 14))
+        if image_num < images and para_num % every == 0:
+            doc.add_picture(io.BytesIO(image_bytes(rng, image_size)), width=Inches(3))
+            image_num += 1
+            if rng.random() < caption_density:
+                doc.add_paragraph(f"Figure {image_num}: {sentence(rng, 5)}")
+    doc.save(path)
+
+
+def build_txt(path, paragraphs, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for para_num in range(paragraphs):
+            f.write(f"Paragraph {para_num}. {sentence(rng, 14)}\n\n")
+
+
+def build_slides(count, figures=0, seed=7):
+    """Return slide dicts like the LLM produces; about a third reference one of the first figures"""
+    rng = random.Random(seed)
+    slides = []
+    for i in range(count):
+        hint = f"Figure {rng.randint(1, figures)}" if figures and rng.random() < 0.33 else ""
+        slides.append({
+            "title": sentence(rng, 4).rstrip("."),
+            "bullets": [sentence(rng, 10) for _ in range(4)],
+            "image_hint": hint
+        })
+    return slides
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("output_dir")
+    arg_parser.add_argument("--pages", type=int, default=50)
+    arg_parser.add_argument("--images-per-page", type=int, default=1)
+    arg_parser.add_argument("--paragraphs", type=int, default=1000)
+    arg_parser.add_argument("--docx-images", type=int, default=40)
+    arg_parser.add_argument("--image-size", type=int, nargs=2, default=[800, 600])
+    arg_parser.add_argument("--caption-density", type=float, default=0.5)
+    args = arg_parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    build_pdf(os.path.join(args.output_dir, "synthetic.pdf"), args.pages, args.images_per_page,
+              tuple(args.image_size), args.caption_density)
+    build_docx(os.path.join(args.output_dir, "synthetic.docx"), args.paragraphs, args.docx_images,
+               tuple(args.image_size), args.caption_density)
+    build_txt(os.path.join(args.output_dir, "synthetic.txt"), args.paragraphs)
+    print(f"Corpus written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
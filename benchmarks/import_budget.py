@@ -0,0 +1,100 @@
+"""Guard cold-start latency: import-time budget and lazy loading of heavy dependencies.
+
+Usage: python benchmarks/import_budget.py [--budget-ms 100] [--repeat 5]
+
+Checks, each in a fresh interpreter:
+  1. Importing the entry-point modules (pipeline, batch, jobs, cache, scheduler) stays
+     within --budget-ms according to `python -X importtime`, best of --repeat runs.
+  2. That import loads none of the format backends or the LLM client.
+  3. Converting a TXT document with the offline LocalBackend loads no PDF or DOCX
+     library, no NumPy and no Gemini client; only python-pptx (which itself imports
+     Pillow) is needed to render.
+Exits with status 1 when any check fails.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENTRY_MODULES = ["src.pipeline", "src.batch", "src.jobs", "src.cache", "src.scheduler"]
+HEAVY_MODULES = ["fitz", "pymupdf", "docx", "pptx", "PIL", "numpy", "google.generativeai"]
+TXT_JOB_ALLOWED = {"pptx", "PIL"}
+
+TXT_JOB_SCRIPT = """
+import io, json, sys
+from src.gemini_api import GeminiProcessor
+from src.llm_backends import LocalBackend
+from src.pipeline import DocumentPipeline
+from src.workspace import JobWorkspace
+
+pipeline = DocumentPipeline(gemini=GeminiProcessor(backend=LocalBackend()), parser_workers=1)
+with JobWorkspace() as workspace:
+    workspace.put("notes.txt", ("Quarterly revenue grew in every region. " * 200).encode("utf-8"))
+    pipeline.run(workspace, "notes.txt", io.BytesIO(), "General", "Formal", "")
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def run_python(args):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_time_ms(modules):
+    """Return (cumulative import milliseconds of the modules, names of every module imported)"""
+    result = run_python(["-X", "importtime", "-c", "import " + ", ".join(modules)])
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        imported.add(name.strip())
+        # Top-level entries (no indentation) already include their nested imports
+        if name.strip() in modules and not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, imported
+
+
+def loaded(modules, names):
+    """Return which of modules (packages) appear among the imported names"""
+    return sorted(m for m in modules if any(name == m or name.startswith(m + ".") for name in names))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--budget-ms", type=float, default=100.0)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    failures = []
+
+    runs = [import_time_ms(ENTRY_MODULES) for _ in range(args.repeat)]
+    best_ms = min(ms for ms, _ in runs)
+    print(f"entry-point import time: {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if best_ms > args.budget_ms:
+        failures.append(f"import time {best_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    eager = loaded(HEAVY_MODULES, runs[0][1])
+    print(f"heavy modules at import: {', '.join(eager) or 'none'}")
+    if eager:
+        failures.append("entry points import heavy modules eagerly: " + ", ".join(eager))
+
+    txt_modules = set(json.loads(run_python(["-c", TXT_JOB_SCRIPT]).stdout.splitlines()[-1]))
+    txt_heavy = loaded(set(HEAVY_MODULES) - TXT_JOB_ALLOWED, txt_modules)
+    print(f"heavy modules for a TXT job: {', '.join(loaded(HEAVY_MODULES, txt_modules)) or 'none'}")
+    if txt_heavy:
+        failures.append("a TXT job loads unneeded modules: " + ", ".join(txt_heavy))
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Time each pipeline stage on a synthetic corpus and compare against a stored baseline.
+
+Usage: python benchmarks/suite.py [--scale 1.0] [--repeat 3] [--output results.json]
+                                  [--baseline benchmarks/baseline.json] [--threshold 0.25]
+                                  [--save-baseline]
+
+Stages: DocumentParser.parse, ImageExtractor.extract, PPTGenerator._find_matching_image
+(over every slide), PPTGenerator.generate and the whole DocumentPipeline end to end with
+the offline LocalBackend in place of Gemini. Each timing is the best of --repeat runs.
+Exits with status 1 when a stage is slower than the baseline by more than --threshold
+(and by more than --min-delta seconds, so tiny timings do not trip on noise), and with
+status 2 when there is no baseline to compare against unless --save-baseline is given.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import build_docx, build_pdf, build_slides, build_txt
+from src.gemini_api import GeminiProcessor
+from src.image_extractor import ImageExtractor
+from src.llm_backends import LocalBackend
+from src.parser import DocumentParser
+from src.pipeline import DocumentPipeline
+from src.ppt_generator import PPTGenerator
+from src.scheduler import RequestScheduler
+from src.workspace import JobWorkspace
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Document name -> (builder, arguments at scale 1.0 with the scaled ones listed last)
+CORPUS = {
+    "pdf_text": (build_pdf, {"images_per_page": 0}, {"pages": 200}),
+    "pdf_images": (build_pdf, {"images_per_page": 2, "image_size": (1200, 900), "caption_density": 0.5},
+                   {"pages": 40}),
+    "docx_images": (build_docx, {"images": 40, "image_size": (1200, 900), "caption_density": 0.5},
+                    {"paragraphs": 2000}),
+    "txt": (build_txt, {}, {"paragraphs": 5000})
+}
+EXTENSIONS = {"pdf_text": ".pdf", "pdf_images": ".pdf", "docx_images": ".docx", "txt": ".txt"}
+SLIDE_COUNT = 40
+
+
+def best_of(repeat, fn):
+    """Return the fastest of repeat runs of fn, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_corpus(tmp_dir, scale):
+    paths = {}
+    for name, (builder, fixed, scaled) in CORPUS.items():
+        path = os.path.join(tmp_dir, name + EXTENSIONS[name])
+        builder(path, **{key: max(1, int(value * scale)) for key, value in scaled.items()}, **fixed)
+        paths[name] = path
+    return paths
+
+
+def bench_document(path, repeat):
+    """Return {stage: seconds} for one document"""
+    timings = {}
+    timings["parse"] = best_of(repeat, lambda: DocumentParser(workers=1).parse(path))
+
+    workspace = JobWorkspace()
+    images = []
+
+    def extract():
+        images[:] = ImageExtractor(workspace=workspace).extract(path)
+    timings["extract"] = best_of(repeat, extract)
+
+    slides = build_slides(SLIDE_COUNT, figures=len(images))
+    if images:
+        def match():
+            generator = PPTGenerator(workspace=workspace)
+            for slide in slides:
+                image = generator._find_matching_image(slide["image_hint"].lower(), images, slide["title"],
+                                                       slide["bullets"])
+                if image:
+                    generator.used_images.add(image["path"])
+        timings["match"] = best_of(repeat, match)
+
+    timings["generate"] = best_of(
+        repeat, lambda: PPTGenerator(workspace=workspace).generate(slides, images, io.BytesIO())
+    )
+
+    # The scheduler's limits are lifted so only the pipeline itself is measured
+    scheduler = RequestScheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_concurrency=64)
+    pipeline = DocumentPipeline(gemini=GeminiProcessor(chunk_tokens=30000, backend=LocalBackend(),
+                                                       scheduler=scheduler), parser_workers=1)
+
+    def end_to_end():
+        with JobWorkspace() as job_workspace:
+            with open(path, "rb") as f:
+                job_workspace.put(os.path.basename(path), f.read())
+            pipeline.run(job_workspace, os.path.basename(path), io.BytesIO(), "General", "Formal", "")
+    timings["end_to_end"] = best_of(repeat, end_to_end)
+
+    workspace.cleanup()
+    return timings
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Return (lines, regressions) comparing results with the baseline's results"""
+    lines = []
+    regressions = []
+    for doc_name, stages in results.items():
+        for stage, seconds in stages.items():
+            previous = baseline.get(doc_name, {}).get(stage)
+            if previous is None:
+                lines.append(f"{doc_name:<12} {stage:<11} {seconds:>9.4f}s  (no baseline)")
+                continue
+            ratio = seconds / previous if previous else float("inf")
+            regressed = ratio > 1 + threshold and seconds - previous > min_delta
+            if regressed:
+                regressions.append(f"{doc_name}/{stage}")
+            lines.append(f"{doc_name:<12} {stage:<11} {seconds:>9.4f}s  baseline {previous:.4f}s  "
+                         f"{ratio:>5.2f}x{'  REGRESSION' if regressed else ''}")
+    return lines, regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for pages and paragraphs")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--documents", nargs="+", choices=sorted(CORPUS), default=sorted(CORPUS))
+    arg_parser.add_argument("--output", help="Write this run's results as JSON")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    arg_parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, e.g. 0.25 = 25%%")
+    arg_parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns below this many seconds")
+    args = arg_parser.parse_args()
+    # Checked before the run so a missing baseline fails fast instead of passing silently
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        arg_parser.error(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+
+    # Per-slide and per-image log lines would otherwise dominate the output
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("src").setLevel(logging.ERROR)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = build_corpus(tmp_dir, args.scale)
+        for doc_name in args.documents:
+            results[doc_name] = bench_document(paths[doc_name], args.repeat)
+
+    run = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        lines, _ = compare(results, {}, args.threshold, args.min_delta)
+        lines.append(f"Baseline saved to {args.baseline}")
+    else:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            raise SystemExit(f"Baseline was recorded at scale {baseline['meta'].get('scale')}, not {args.scale}")
+        lines, regressions = compare(results, baseline["results"], args.threshold, args.min_delta)
+
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}: "
+              + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from src import instrumentation
+from src.parser import DocumentParser, open_pdf, rewind, source_extension
+from src.image_extractor import ImageExtractor
+
+
+class DocumentAnalyzer:
+    """Open a document once and produce its text, captions and images together"""
+
+    # Bump when the analysis result layout changes so cached results are invalidated
+    VERSION = "1"
+
+    def __init__(self, parser=None, image_extractor=None):
+        self.parser = parser or DocumentParser()
+        self.image_extractor = image_extractor or ImageExtractor()
+
+    def analyze(self, file_path, spill=None):
+        """Return a dict with "text", "page_texts", "captions" and "images" for the document
+
+        file_path may be a path or a binary file object whose name carries the extension.
+        For file objects, spill() may return a file path to the same document; it is called
+        only when a PDF is large enough for parallel text extraction, whose worker processes
+        reopen the file.
+        """
+        file_ext = source_extension(file_path)
+
+        if file_ext == '.pdf':
+            return self._analyze_pdf(file_path, spill)
+        elif file_ext == '.docx':
+            return self._analyze_docx(file_path)
+        elif file_ext == '.txt':
+            text = self.parser.parse(file_path)
+            return {"text": text, "page_texts": [text], "captions": [], "images": []}
+        else:
+            raise ValueError("Unsupported file format")
+
+    def _analyze_pdf(self, file_path, spill=None):
+        with open_pdf(file_path) as doc:
+            with instrumentation.span("analyze.text", pages=doc.page_count):
+                can_reopen = isinstance(file_path, str) or spill is not None
+                if can_reopen and self.parser._use_parallel(doc.page_count):
+                    # Large documents still fan text extraction out to worker processes
+                    path = file_path if isinstance(file_path, str) else spill()
+                    page_texts = list(self.parser._iter_pdf_parallel(path, doc.page_count))
+                else:
+                    page_texts = list(self.parser._iter_pdf_doc(doc))
+            instrumentation.count("pages", len(page_texts))
+
+            extractor = self.image_extractor
+            with instrumentation.span("analyze.images"):
+                page_captions = [extractor._extract_captions(page_text) for page_text in page_texts]
+                images = extractor._extract_pdf_images(doc, page_texts, page_captions)
+
+        return {
+            "text": "".join(page_texts),
+            "page_texts": page_texts,
+            "captions": [caption for captions in page_captions for _, caption in captions],
+            "images": images
+        }
+
+    def _analyze_docx(self, file_path):
+        from docx import Document
+
+        doc = Document(rewind(file_path))
+        paragraphs = [p.text for p in doc.paragraphs]
+        text = "\n".join(paragraphs)
+
+        instrumentation.count("pages")
+
+        with instrumentation.span("analyze.images"):
+            captions = self.image_extractor._extract_docx_captions(paragraphs)
+            images = self.image_extractor._extract_docx_images(doc, captions)
+
+        return {
+            "text": text,
+            "page_texts": [text],
+            "captions": [caption for _, caption in captions],
+            "images": images
+        }
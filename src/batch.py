@@ -0,0 +1,268 @@
+"""Convert a directory or JSONL manifest of documents into decks without the Streamlit UI.
+
+Usage: python -m src.batch INPUT --output-dir output/batch [--workers 4] [--results results.jsonl]
+
+INPUT is a directory (every PDF, DOCX and TXT file below it is converted with the
+command-line audience, tone and instructions) or a JSONL manifest whose records hold
+"path" and optionally "id", "audience", "tone", "instructions" and "output".
+Finished jobs are recorded in the results file and skipped when the batch is rerun.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src import instrumentation
+from src.workspace import JobWorkspace
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+logger = logging.getLogger(__name__)
+
+# Per-process pipeline, built once by _init_worker
+_pipeline = None
+
+
+def load_jobs(input_path, output_dir, audience, tone, instructions):
+    """Return job dicts for a directory of documents or a JSONL manifest
+
+    Raises ValueError when two jobs would write the same deck.
+    """
+    if os.path.isdir(input_path):
+        jobs = _load_directory(input_path, output_dir, audience, tone, instructions)
+    else:
+        jobs = _load_manifest(input_path, output_dir, audience, tone, instructions)
+
+    outputs = {}
+    for job in jobs:
+        output = os.path.normcase(os.path.abspath(job["output"]))
+        if output in outputs:
+            raise ValueError(f"jobs {outputs[output]!r} and {job['id']!r} would both write {job['output']}")
+        outputs[output] = job["id"]
+    return jobs
+
+
+def _load_directory(input_path, output_dir, audience, tone, instructions):
+    jobs = []
+    for root, dirs, files in os.walk(input_path):
+        dirs.sort()
+        for file_name in sorted(files):
+            if os.path.splitext(file_name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            path = os.path.join(root, file_name)
+            job_id = os.path.relpath(path, input_path)
+            jobs.append({
+                "id": job_id,
+                "path": path,
+                "audience": audience,
+                "tone": tone,
+                "instructions": instructions,
+                "output": default_output(output_dir, job_id)
+            })
+    return jobs
+
+
+def _load_manifest(input_path, output_dir, audience, tone, instructions):
+    jobs = []
+    # Relative document and output paths in a manifest are resolved against the manifest's directory
+    manifest_dir = os.path.dirname(os.path.abspath(input_path))
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "path" not in record:
+                raise ValueError(f"Manifest line {line_num} has no 'path'")
+            path = os.path.join(manifest_dir, record["path"])
+            job_id = record.get("id") or record["path"]
+            # An explicit "output" may point anywhere; derived ones must stay inside output_dir
+            output = record.get("output")
+            if output:
+                output = os.path.join(manifest_dir, output)
+            else:
+                try:
+                    output = default_output(output_dir, job_id)
+                except ValueError as e:
+                    raise ValueError(f"Manifest line {line_num}: {e}")
+            jobs.append({
+                "id": job_id,
+                "path": path,
+                "audience": record.get("audience", audience),
+                "tone": record.get("tone", tone),
+                "instructions": record.get("instructions", instructions),
+                "output": output
+            })
+    return jobs
+
+
+def default_output(output_dir, job_id):
+    """Return the deck path for a job inside output_dir, rejecting IDs that would escape it
+
+    The source extension is kept (report.pdf -> report.pdf.pptx) so report.pdf and
+    report.docx in one directory get separate decks.
+    """
+    output = os.path.normpath(os.path.join(output_dir, job_id + ".pptx"))
+    root = os.path.abspath(output_dir)
+    if os.path.commonpath([root, os.path.abspath(output)]) != root:
+        raise ValueError(f"output for job {job_id!r} would be written outside {output_dir}; set \"output\" or \"id\"")
+    return output
+
+
+def load_finished(results_path):
+    """Return the IDs of jobs that already succeeded according to the results file"""
+    finished = set()
+    if not os.path.exists(results_path):
+        return finished
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A batch killed mid-write can leave a truncated last line
+                continue
+            if record.get("status") == "ok" and os.path.exists(record.get("output", "")):
+                finished.add(record["id"])
+    return finished
+
+
+def _init_worker(workers, fast_render, instrument):
+    """Build the pipeline once per worker process, sharing the LLM rate limits between workers"""
+    global _pipeline
+    # Workers only record; the parent merges their data and writes the exports
+    instrumentation.configure(enabled=instrument, jsonl_path="", prometheus_path="")
+    for name, default in (("LLM_REQUESTS_PER_MINUTE", "60"), ("LLM_TOKENS_PER_MINUTE", "1000000")):
+        os.environ[name] = str(max(1, int(os.getenv(name, default)) // workers))
+
+    from src.cache import get_default_cache, get_default_response_cache
+    from src.pipeline import DocumentPipeline
+    _pipeline = DocumentPipeline(
+        document_cache=get_default_cache(),
+        response_cache=get_default_response_cache(),
+        parser_workers=1,
+        fast_render=fast_render
+    )
+
+
+def run_job(job):
+    """Convert one document in a worker process and return its result record"""
+    start = time.perf_counter()
+    record = {"id": job["id"], "path": job["path"], "output": job["output"]}
+    # Written beside the final path and renamed, so a killed job never looks finished
+    tmp_output = f"{job['output']}.tmp-{os.getpid()}"
+    try:
+        with JobWorkspace() as workspace:
+            name = os.path.basename(job["path"])
+            with open(job["path"], "rb") as f:
+                workspace.put(name, f.read())
+
+            output_dir = os.path.dirname(job["output"])
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            result = _pipeline.run(workspace, name, tmp_output, job["audience"], job["tone"], job["instructions"])
+            os.replace(tmp_output, job["output"])
+
+        record.update(status="ok", slides=len(result["slides"]), timings=result["timings"])
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+        try:
+            os.remove(tmp_output)
+        except OSError:
+            pass
+    record["seconds"] = time.perf_counter() - start
+    if instrumentation.is_enabled():
+        record["instrumentation"] = instrumentation.drain()
+    return record
+
+
+def run_batch(jobs, results_path, workers=1, fast_render=False):
+    """Run jobs on a process pool, appending one result record per job to results_path
+
+    Returns a summary with counts, documents per minute and per-stage time totals.
+    """
+    stage_totals = {}
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+
+    results_dir = os.path.dirname(results_path)
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+
+    with open(results_path, "a", encoding="utf-8") as results, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(workers, fast_render, instrumentation.is_enabled())) as pool:
+        jobs_iter = iter(jobs)
+        pending = set()
+        while True:
+            # Keep a bounded number of jobs queued so huge manifests are not submitted at once
+            for job in jobs_iter:
+                pending.add(pool.submit(run_job, job))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                if "instrumentation" in record:
+                    instrumentation.merge(record.pop("instrumentation"))
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+
+                counts[record["status"]] += 1
+                for stage, seconds in record.get("timings", {}).items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+                if record["status"] == "ok":
+                    logger.info("[ok] %s (%.1fs)", record["id"], record["seconds"])
+                else:
+                    logger.error("[error] %s (%.1fs): %s", record["id"], record["seconds"], record["error"])
+
+    elapsed = time.perf_counter() - start
+    total = counts["ok"] + counts["error"]
+    return {
+        "documents": total,
+        "succeeded": counts["ok"],
+        "failed": counts["error"],
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_minute": round(total / elapsed * 60, 2) if elapsed else 0.0,
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_totals.items()}
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("input", help="Directory of documents or JSONL manifest")
+    arg_parser.add_argument("--output-dir", default=os.path.join("output", "batch"))
+    arg_parser.add_argument("--results", help="Results JSONL (default: <output-dir>/results.jsonl)")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument("--audience", default="General")
+    arg_parser.add_argument("--tone", default="Formal")
+    arg_parser.add_argument("--instructions", default="")
+    arg_parser.add_argument("--fast-render", action="store_true", help="Use the bulk XML slide renderer")
+    arg_parser.add_argument("--metrics-jsonl", help="Append per-span timing and memory records to this file")
+    arg_parser.add_argument("--metrics-prom", help="Write Prometheus text metrics to this file")
+    arg_parser.add_argument("--log-level", default="INFO")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.metrics_jsonl or args.metrics_prom:
+        instrumentation.configure(enabled=True, jsonl_path=args.metrics_jsonl, prometheus_path=args.metrics_prom)
+
+    results_path = args.results or os.path.join(args.output_dir, "results.jsonl")
+    jobs = load_jobs(args.input, args.output_dir, args.audience, args.tone, args.instructions)
+    finished = load_finished(results_path)
+    todo = [job for job in jobs if job["id"] not in finished]
+    logger.info("%d documents, %d already finished, %d to convert", len(jobs), len(jobs) - len(todo), len(todo))
+
+    summary = run_batch(todo, results_path, workers=max(1, args.workers), fast_render=args.fast_render)
+    instrumentation.flush()
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from src.analyzer import DocumentAnalyzer
+from src.parser import DocumentParser
+from src.image_extractor import ImageExtractor
+
+
+class DocumentCache:
+    """On-disk cache of parse and image-extraction results keyed by file content"""
+
+    def __init__(self, cache_dir="cache/documents", max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, file_path):
+        """Build the cache key from the file's SHA-256 and the parser, extractor and analyzer versions
+
+        file_path may also be the document's bytes (or any buffer) when it is held in memory.
+        """
+        if isinstance(file_path, str):
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+        else:
+            digest = hashlib.sha256(file_path)
+        versions = f"p{DocumentParser.VERSION}-e{ImageExtractor.VERSION}-a{DocumentAnalyzer.VERSION}"
+        return f"{digest.hexdigest()}-{versions}"
+
+    def get(self, key):
+        """Return the cached analysis dict for key, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Touch the entry so eviction sees it as recently used; fails if it was just evicted
+            os.utime(entry_dir)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        for image in entry["images"]:
+            image["path"] = os.path.join(entry_dir, image["path"])
+            if "size" in image:
+                image["size"] = tuple(image["size"])
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, analysis, workspace=None):
+        """Store a DocumentAnalyzer result and its image files, returning the cached entry
+
+        Image paths are read from workspace when the analysis was extracted into one.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(os.path.join(tmp_dir, "images"))
+
+        cached_images = []
+        for image in analysis["images"]:
+            name = os.path.join("images", os.path.basename(image["path"]))
+            if workspace is not None and image["path"] in workspace:
+                with open(os.path.join(tmp_dir, name), "wb") as f:
+                    f.write(workspace.getbuffer(image["path"]))
+            else:
+                shutil.copyfile(image["path"], os.path.join(tmp_dir, name))
+            cached_images.append(dict(image, path=name))
+
+        entry = dict(analysis, images=cached_images)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another job stored the same document first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._evict(keep=key)
+        entry["images"] = [dict(image, path=os.path.join(entry_dir, image["path"])) for image in cached_images]
+        return entry
+
+    def stats(self):
+        """Return hit/miss counters for this cache instance"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _evict(self, keep):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        evicted = _evict_lru(self.cache_dir, self.max_bytes, keep)
+        with self._lock:
+            self.evictions += evicted
+
+
+class ResponseCache:
+    """On-disk cache of validated LLM slide lists keyed by prompt fingerprint"""
+
+    def __init__(self, cache_dir="cache/responses", ttl=7 * 24 * 3600, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, prompt, model_name, params):
+        """Fingerprint a request from its prompt, model and generation parameters"""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached slide list for key, or None when missing or expired"""
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        # Empty slide lists are never valid; older versions could store one from a bad stream
+        if entry is None or not entry["slides"] or time.time() - entry["created"] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+            self.latency_saved += entry["latency"]
+        return entry["slides"]
+
+    def put(self, key, slides, latency):
+        """Store a validated slide list along with the latency it took to generate"""
+        if not slides:
+            return
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        tmp_path = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "latency": latency, "slides": slides}, f)
+        os.replace(tmp_path, path)
+
+        evicted = _evict_lru(self.cache_dir, self.max_bytes, f"{key}.json")
+        with self._lock:
+            self.evictions += evicted
+
+    def stats(self):
+        """Return hit/miss counters and the total generation time saved by hits"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3)
+            }
+
+
+def _evict_lru(cache_dir, max_bytes, keep):
+    """Delete the least recently used entries in cache_dir until it fits in max_bytes"""
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(".tmp-"):
+            continue
+        size = _dir_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        entries.append((os.path.getmtime(path), name, path, size))
+        total += size
+
+    evicted = 0
+    for _, name, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def _dir_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+_default_cache = None
+_default_response_cache = None
+
+
+def get_default_cache():
+    """Return the process-wide document cache so stats survive app reruns"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DocumentCache()
+    return _default_cache
+
+
+def get_default_response_cache():
+    """Return the process-wide LLM response cache so stats survive app reruns"""
+    global _default_response_cache
+    if _default_response_cache is None:
+        _default_response_cache = ResponseCache()
+    return _default_response_cache
@@ -1,63 +1,310 @@
-import google.generativeai as genai
 import json
-import os
-from dotenv import load_dotenv
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import instrumentation
+from src.llm_backends import create_backend
+from src.scheduler import get_scheduler
+from src.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class SlideStreamParser:
+    """Incrementally parse a streamed JSON array of slides, emitting each object once it closes"""
 
-class GeminiProcessor:
     def __init__(self):
-        load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        genai.configure(api_key=api_key)
-        
-        # Use the newer model version
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    def process(self, text_content, target_audience, tone, custom_instructions):
-        prompt = self._create_prompt(text_content, target_audience, tone, custom_instructions)
+        self.finished = False
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        # Slides found in the current top-level array; arrays without any are skipped
+        self._array_slides = 0
+
+    def feed(self, text):
+        """Consume more response text and return the slide dicts completed by it"""
+        slides = []
+        self._buffer += text
         
-        try:
-            # Generate content using the correct model name
-            response = self.model.generate_content(prompt)
+        while self._pos < len(self._buffer) and not self.finished:
+            char = self._buffer[self._pos]
             
-            if not response.text:
-                raise ValueError("Empty response received from Gemini API")
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth > 0:
+                self._in_string = True
+            elif char in "[{":
+                # Text before the opening bracket (e.g. a code fence) is ignored
+                if self._depth == 0 and char == "{":
+                    self._pos += 1
+                    continue
+                self._depth += 1
+                if self._depth == 2 and char == "{":
+                    self._object_start = self._pos
+            elif char in "]}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 1 and char == "}":
+                    slides.append(json.loads(self._buffer[self._object_start:self._pos + 1]))
+                    self._object_start = None
+                    self._array_slides += 1
+                elif self._depth == 0:
+                    # A bracket in prose before the real array (e.g. "[see below]") is not the answer
+                    self.finished = self._array_slides > 0
             
-            # Clean and format the response text
-            response_text = response.text.strip()
-            
-            # Find the last complete JSON array
-            start_idx = response_text.find('[')
-            end_idx = response_text.rfind(']')
-            
-            if start_idx == -1 or end_idx == -1:
-                raise ValueError("Response does not contain a JSON array")
-            
-            # Extract the complete JSON array
-            json_text = response_text[start_idx:end_idx + 1]
+            self._pos += 1
+        
+        # Drop consumed text that no pending object still needs
+        keep_from = self._object_start if self._object_start is not None else self._pos
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+        
+        return slides
+
+
+class GeminiProcessor:
+    def __init__(self, chunk_tokens=None, max_concurrency=4, generation_config=None, response_cache=None, backend=None,
+                 scheduler=None, json_retries=2):
+        # Any LLMBackend; defaults to Gemini unless LLM_BACKEND selects another one
+        self.generation_config = generation_config or {}
+        self.backend = backend or create_backend(self.generation_config)
+        self.model_name = self.backend.model_name
+        
+        # Every backend call goes through the process-wide RequestScheduler by default
+        self.scheduler = scheduler or get_scheduler()
+        # Extra requests made when a response is not a valid slide array
+        self.json_retries = json_retries
+        
+        # Optional ResponseCache holding validated slide lists for repeated requests
+        self.response_cache = response_cache
+        
+        # Documents above this many tokens are summarized chunk by chunk first
+        self.chunk_tokens = chunk_tokens
+        # Maximum number of chunk summaries requested at the same time
+        self.max_concurrency = max_concurrency
+    
+    def process(self, text_content, target_audience, tone, custom_instructions, use_cache=True, refresh_cache=False):
+        """Return the validated slide list, answering from the response cache when possible
+
+        use_cache=False bypasses the cache entirely; refresh_cache=True skips the
+        lookup but stores the fresh response.
+        """
+        cache = self.response_cache if use_cache else None
+        if cache:
+            prompt = self._create_prompt(text_content, target_audience, tone, custom_instructions)
+            cache_key = cache.key_for(prompt, self.model_name, self._cache_params())
+            if not refresh_cache:
+                cached_slides = cache.get(cache_key)
+                if cached_slides is not None:
+                    return cached_slides
+        
+        start = time.perf_counter()
+        slides = self._generate_slides(text_content, target_audience, tone, custom_instructions)
+        
+        if cache:
+            cache.put(cache_key, slides, time.perf_counter() - start)
+        return slides
+    
+    def stream(self, text_content, target_audience, tone, custom_instructions, use_cache=True, refresh_cache=False):
+        """Yield validated slide dicts as soon as each one is complete in the streamed response"""
+        cache = self.response_cache if use_cache else None
+        if cache:
+            prompt = self._create_prompt(text_content, target_audience, tone, custom_instructions)
+            cache_key = cache.key_for(prompt, self.model_name, self._cache_params())
+            if not refresh_cache:
+                cached_slides = cache.get(cache_key)
+                if cached_slides is not None:
+                    yield from cached_slides
+                    return
+        
+        start = time.perf_counter()
+        slides = []
+        try:
+            text_content = self._fit_to_budget(text_content, target_audience, tone, custom_instructions)
             
-            try:
-                parsed_response = json.loads(json_text)
-            except json.JSONDecodeError as e:
-                print(f"Raw response: {response_text}")
-                raise ValueError(f"Failed to parse Gemini response as JSON: {str(e)}")
+            prompt = self._create_prompt(text_content, target_audience, tone, custom_instructions)
+            tokens = estimate_tokens(prompt)
             
-            # Validate response structure
-            if not isinstance(parsed_response, list):
-                raise ValueError("Response must be a list of slides")
+            # Malformed or truncated JSON is re-requested as long as no slide has been yielded yet
+            for attempt in range(self.json_retries + 1):
+                slide_parser = SlideStreamParser()
+                instrumentation.count("prompt_tokens", tokens)
+                try:
+                    chunks = self.scheduler.stream(lambda: self.backend.stream(prompt), tokens)
+                    for chunk in chunks:
+                        for slide in slide_parser.feed(chunk):
+                            self._validate_slide(slide)
+                            slides.append(slide)
+                            yield slide
+                    
+                    if not slide_parser.finished:
+                        raise ValueError("Response does not contain a complete JSON array of slides")
+                    break
+                except ValueError:
+                    if slides or attempt == self.json_retries:
+                        raise
+                    logger.warning("Invalid slide JSON received, re-requesting (attempt %d)", attempt + 2)
+                
+        except Exception as e:
+            raise ValueError(f"Error processing Gemini request: {str(e)}")
+        
+        # Only complete, fully validated, non-empty responses are cached
+        if cache:
+            cache.put(cache_key, slides, time.perf_counter() - start)
+    
+    def _cache_params(self):
+        """Settings besides the prompt that change the generated slides"""
+        return {"generation_config": self.generation_config, "chunk_tokens": self.chunk_tokens}
+    
+    def _generate_slides(self, text_content, target_audience, tone, custom_instructions):
+        try:
+            # Map: summarize chunks in parallel, then reduce the summaries into slides
+            text_content = self._fit_to_budget(text_content, target_audience, tone, custom_instructions)
             
-            for slide in parsed_response:
-                if not isinstance(slide, dict):
-                    raise ValueError("Each slide must be a dictionary")
-                if "title" not in slide or "bullets" not in slide:
-                    raise ValueError("Each slide must have 'title' and 'bullets' fields")
+            prompt = self._create_prompt(text_content, target_audience, tone, custom_instructions)
             
-            return parsed_response
+            # Malformed or truncated JSON is re-requested before giving up
+            for attempt in range(self.json_retries + 1):
+                response_text = self._generate(prompt)
+                try:
+                    return self._parse_slides(response_text)
+                except ValueError:
+                    if attempt == self.json_retries:
+                        raise
+                    logger.warning("Invalid slide JSON received, re-requesting (attempt %d)", attempt + 2)
             
         except Exception as e:
             raise ValueError(f"Error processing Gemini request: {str(e)}")
     
+    def _generate(self, prompt):
+        """Send one prompt through the scheduler and return the response text"""
+        tokens = estimate_tokens(prompt)
+        instrumentation.count("prompt_tokens", tokens)
+        with instrumentation.span("llm.request", tokens=tokens):
+            response_text = self.scheduler.submit(lambda: self.backend.generate(prompt), tokens)
+        if not response_text:
+            raise ValueError("Empty response received from Gemini API")
+        return response_text
+    
+    def _parse_slides(self, response_text):
+        """Extract and validate the JSON slide array from a model response"""
+        # Clean and format the response text
+        response_text = response_text.strip()
+        
+        # Find the last complete JSON array
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']')
+        
+        if start_idx == -1 or end_idx == -1:
+            raise ValueError("Response does not contain a JSON array")
+        
+        # Extract the complete JSON array
+        json_text = response_text[start_idx:end_idx + 1]
+        
+        try:
+            parsed_response = json.loads(json_text)
+        except json.JSONDecodeError as e:
+            logger.debug("Raw response: %s", response_text)
+            raise ValueError(f"Failed to parse Gemini response as JSON: {str(e)}")
+        
+        # Validate response structure
+        if not isinstance(parsed_response, list):
+            raise ValueError("Response must be a list of slides")
+        if not parsed_response:
+            raise ValueError("Response contains no slides")
+        
+        for slide in parsed_response:
+            self._validate_slide(slide)
+        
+        return parsed_response
+    
+    def _validate_slide(self, slide):
+        if not isinstance(slide, dict):
+            raise ValueError("Each slide must be a dictionary")
+        if "title" not in slide or "bullets" not in slide:
+            raise ValueError("Each slide must have 'title' and 'bullets' fields")
+    
+    def _fit_to_budget(self, text_content, target_audience, tone, custom_instructions):
+        """Summarize text in rounds until it fits within chunk_tokens, or return it unchanged"""
+        while self.chunk_tokens and estimate_tokens(text_content) > self.chunk_tokens:
+            summarized = self._summarize_chunks(text_content, target_audience, tone, custom_instructions)
+            if estimate_tokens(summarized) >= estimate_tokens(text_content):
+                # Another round would not get any closer to the budget
+                logger.warning("Chunk summaries did not shrink the text (%d tokens), sending it as is",
+                               estimate_tokens(summarized))
+                return summarized
+            text_content = summarized
+        return text_content
+    
+    def _summarize_chunks(self, text_content, target_audience, tone, custom_instructions):
+        """Summarize token-budgeted chunks concurrently and join the summaries in document order"""
+        chunks = self._split_text(text_content, self.chunk_tokens)
+        
+        def summarize(chunk):
+            prompt = self._create_summary_prompt(chunk, target_audience, tone, custom_instructions)
+            return self._generate(prompt).strip()
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            summaries = list(pool.map(summarize, chunks))
+        
+        return "\n\n".join(summaries)
+    
+    def _split_text(self, text_content, max_tokens):
+        """Split text into chunks within max_tokens, preferring paragraph and line boundaries"""
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        
+        # Break oversized paragraphs into lines, and oversized lines into fixed slices.
+        # Each piece keeps the separator that preceded it, so chunks keep their paragraph breaks.
+        pieces = []
+        for paragraph in re.split(r'\n\s*\n', text_content):
+            units = [paragraph] if len(paragraph) <= max_chars else paragraph.split("\n")
+            for unit_idx, unit in enumerate(units):
+                unit_sep = "\n\n" if unit_idx == 0 else "\n"
+                for i in range(0, len(unit), max_chars):
+                    pieces.append((unit_sep if i == 0 else "", unit[i:i + max_chars]))
+        
+        chunks = []
+        current = []
+        size = 0
+        for sep, piece in pieces:
+            if current and size + len(sep) + len(piece) > max_chars:
+                chunks.append("".join(current))
+                current, size = [], 0
+            if current:
+                current.append(sep)
+                size += len(sep)
+            current.append(piece)
+            size += len(piece)
+        if current:
+            chunks.append("".join(current))
+        
+        return [chunk for chunk in chunks if chunk.strip()]
+    
+    def _create_summary_prompt(self, text_content, target_audience, tone, custom_instructions):
+        return f"""
+        Summarize the following section of a longer document for a presentation.
+        Keep every key fact, figure, metric and figure/table reference.
+        Respond with concise plain-text notes only.
+        
+        Target Audience: {target_audience}
+        Tone: {tone}
+        Additional Instructions: {custom_instructions}
+        
+        Section Content:
+        {text_content}
+        """
+    
     def _create_prompt(self, text_content, target_audience, tone, custom_instructions):
         return f"""
         Create a presentation outline from the following text content.
@@ -81,4 +328,4 @@ class GeminiProcessor:
                 "image_hint": "Page number or context where an image might be relevant"
             }}
         ]
-        """
\ No newline at end of file
+        """
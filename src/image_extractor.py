@@ -1,42 +1,110 @@
-import fitz  # PyMuPDF for PDF processing
-from docx import Document  # For DOCX processing
+import logging
 import os
-from PIL import Image
 import io
 import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from src import instrumentation
+from src.parser import open_pdf, rewind, source_extension
+
+logger = logging.getLogger(__name__)
+
+
+class PageTextIndex:
+    """Word positions of a PDF page, sorted vertically for fast region queries"""
+
+    def __init__(self, page):
+        # Layout analysis runs once per page instead of once per clip query
+        words = page.get_text("words")
+        entries = []
+        for x0, y0, x1, y1, word, block_no, line_no, word_no in words:
+            entries.append(((y0 + y1) / 2, (x0 + x1) / 2, (block_no, line_no, word_no), word))
+        entries.sort(key=lambda entry: entry[0])
+        self._centers_y = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def text_in(self, rect):
+        """Return the text whose words are centred inside rect, one line per text line"""
+        x0, y0, x1, y1 = rect
+        start = bisect_left(self._centers_y, y0)
+        stop = bisect_right(self._centers_y, y1)
+        selected = sorted(
+            (entry[2], entry[3]) for entry in self._entries[start:stop]
+            if x0 <= entry[1] <= x1
+        )
+
+        lines = []
+        current_line = None
+        for (block_no, line_no, _), word in selected:
+            if (block_no, line_no) != current_line:
+                lines.append([])
+                current_line = (block_no, line_no)
+            lines[-1].append(word)
+        return "".join(" ".join(line) + "\n" for line in lines)
 
 
 class ImageExtractor:
+    # Bump when extraction output changes so cached results are invalidated
+    VERSION = "5"
+
+    # Formats python-pptx can embed directly, so they are written without re-encoding
+    PASSTHROUGH_FORMATS = {"png", "jpg", "jpeg", "jpe", "gif", "bmp", "tif", "tiff"}
+
+    def __init__(self, workers=1, workspace=None):
+        # Threads used to probe, convert and write images; 1 keeps everything inline
+        self.workers = workers
+        # Optional JobWorkspace; image paths are then workspace names instead of files
+        self.workspace = workspace
+
     def extract(self, file_path):
-        print(f"Extracting images from: {file_path}")
-        ext = os.path.splitext(file_path)[1].lower()
+        logger.info("Extracting images from: %s", getattr(file_path, 'name', file_path))
+        ext = source_extension(file_path)
 
-        if ext == '.pdf':
-            return self._extract_from_pdf(file_path)
-        elif ext == '.docx':
-            return self._extract_from_docx(file_path)
-        else:
-            print("Unsupported file format for image extraction.")
-            return []
+        with instrumentation.span("extract_images", format=ext):
+            if ext == '.pdf':
+                return self._extract_from_pdf(file_path)
+            elif ext == '.docx':
+                return self._extract_from_docx(file_path)
+            else:
+                logger.warning("Unsupported file format for image extraction: %s", ext)
+                return []
 
     def _extract_from_pdf(self, file_path):
-        images = []
-        doc = fitz.open(file_path)
+        with open_pdf(file_path) as doc:
+            # First, get all page texts to help with context lookup
+            page_texts = [page.get_text() for page in doc]
+            page_captions = [self._extract_captions(page_text) for page_text in page_texts]
+            return self._extract_pdf_images(doc, page_texts, page_captions)
 
-        # First, get all page texts to help with context lookup
-        page_texts = [page.get_text() for page in doc]
+    def _extract_pdf_images(self, doc, page_texts, page_captions):
+        """Extract images from an open PDF using precomputed page texts and captions"""
+        return self._run_image_jobs(self._iter_pdf_image_jobs(doc, page_texts, page_captions))
 
+    def _iter_pdf_image_jobs(self, doc, page_texts, page_captions):
+        """Yield (record, write task, error message) for each PDF image; fitz calls stay on this thread"""
         for page_num, page in enumerate(doc, start=1):
             page_text = page_texts[page_num-1]
-            
-            # Extract figure/table captions before processing images
-            captions = self._extract_captions(page_text)
+            captions = page_captions[page_num-1]
+            text_index = None
             
             # Process images on the page
             image_list = page.get_images(full=True)
             for img_index, img in enumerate(image_list):
                 try:
                     xref = img[0]
+                    width, height = img[2], img[3]
+                    
+                    # Skip very small images (likely icons or bullets)
+                    if width < 100 or height < 100:
+                        continue
+                        
+                    # Skip excessively wide images that might be horizontal rules
+                    if width > height * 10:
+                        continue
+
                     base_image = doc.extract_image(xref)
                     image_bytes = base_image["image"]
                     img_ext = base_image["ext"]
@@ -44,20 +112,8 @@ class ImageExtractor:
                     # Skip SVG images as they often cause issues
                     if img_ext.lower() == 'svg':
                         continue
-                        
-                    image = Image.open(io.BytesIO(image_bytes))
 
-                    # Skip very small images (likely icons or bullets)
-                    if image.width < 100 or image.height < 100:
-                        continue
-                        
-                    # Skip excessively wide images that might be horizontal rules
-                    if image.width > image.height * 10:
-                        continue
-
-                    os.makedirs("extracted/images", exist_ok=True)
-                    image_path = f"extracted/images/pdf_page{page_num}_img{img_index + 1}.{img_ext}"
-                    image.save(image_path)
+                    task = partial(self._write_image, image_bytes, img_ext, f"pdf_page{page_num}_img{img_index + 1}")
 
                     # Find the best caption for this image
                     best_caption = self._find_best_caption(captions, img_index)
@@ -65,11 +121,16 @@ class ImageExtractor:
                     # If no specific caption, extract surrounding text for context
                     if not best_caption:
                         # Get text in a window around the image's position
-                        rect = page.get_image_bbox(xref)
+                        # PyMuPDF takes the get_images() item (or its name) here, not the xref
+                        rect = page.get_image_bbox(img)
                         if rect:
+                            # Built on first use so caption-only pages skip layout analysis
+                            if text_index is None:
+                                text_index = PageTextIndex(page)
+                            
                             # Get text above and below the image
-                            text_above = page.get_text("text", clip=(rect[0], rect[1]-200, rect[2], rect[1]))
-                            text_below = page.get_text("text", clip=(rect[0], rect[3], rect[2], rect[3]+200))
+                            text_above = text_index.text_in((rect[0], rect[1]-200, rect[2], rect[1]))
+                            text_below = text_index.text_in((rect[0], rect[3], rect[2], rect[3]+200))
                             surrounding_text = (text_above + " " + text_below).strip()
                             
                             # If surrounding text is found, use it as caption
@@ -81,107 +142,212 @@ class ImageExtractor:
                         # Extract keywords from page text for context
                         best_caption = self._extract_keywords(page_text)
                     
-                    images.append({
-                        "path": image_path,
+                    record = {
+                        "path": None,
                         "page": page_num,
                         "context": best_caption,
-                        "size": image.size
-                    })
+                        "size": (width, height)
+                    }
+                    yield record, task, f"Failed to extract image on page {page_num}"
 
                 except Exception as e:
-                    print(f"Failed to extract image on page {page_num}: {e}")
+                    logger.warning("Failed to extract image on page %d: %s", page_num, e)
                     continue
 
-        return images
-
     def _extract_from_docx(self, file_path):
-        images = []
-        doc = Document(file_path)
+        from docx import Document  # For DOCX processing
+
+        doc = Document(rewind(file_path))
         
         # Extract all paragraphs for context
         paragraphs = [p.text for p in doc.paragraphs]
-        
-        # Identify caption paragraphs
+        return self._extract_docx_images(doc, self._extract_docx_captions(paragraphs))
+
+    def _extract_docx_captions(self, paragraphs):
+        """Identify caption paragraphs as (paragraph index, text) pairs"""
         captions = []
         for i, para in enumerate(paragraphs):
             if re.search(r'(Figure|Fig\.?|Table)\s*\d+', para, re.IGNORECASE):
                 captions.append((i, para))
+        return captions
 
-        for i, rel in enumerate(doc.part._rels.values()):
-            if "image" in rel.target_ref:
-                try:
-                    image_data = rel.target_part.blob
-                    image = Image.open(io.BytesIO(image_data))
-                    
-                    # Skip tiny images (likely icons or bullets)
-                    if image.width < 100 or image.height < 100:
-                        continue
+    def _extract_docx_images(self, doc, captions):
+        """Extract images from an open DOCX document using precomputed captions"""
+        return self._run_image_jobs(self._iter_docx_image_jobs(doc, captions))
 
-                    os.makedirs("extracted/images", exist_ok=True)
-                    image_path = f"extracted/images/docx_image{i + 1}.png"
-                    image.save(image_path)
+    def _iter_docx_image_jobs(self, doc, captions):
+        """Yield (record builder, probe-and-write task, error message) for each DOCX image relationship
 
-                    # Find the best context for this image
-                    context = ""
-                    
-                    # First try to find the paragraph that references this image
-                    for para_idx, para in enumerate(doc.paragraphs):
-                        if rel.target_ref in para._element.xml:
-                            # Found the paragraph with this image
-                            # Get context from surrounding paragraphs
-                            start_idx = max(0, para_idx - 1)
-                            end_idx = min(len(doc.paragraphs), para_idx + 2)
-                            
-                            context_paragraphs = [doc.paragraphs[j].text for j in range(start_idx, end_idx)]
-                            context = " ".join(context_paragraphs)
-                            break
-                    
-                    # If no paragraph references this image directly, look for nearby captions
-                    if not context:
-                        # Find caption closest to this image's reference
-                        for para_idx, para in enumerate(doc.paragraphs):
-                            if rel.target_ref in para._element.xml:
-                                # Look for the closest caption
-                                closest_caption = None
-                                min_distance = float('inf')
-                                
-                                for caption_idx, caption_text in captions:
-                                    distance = abs(caption_idx - para_idx)
-                                    if distance < min_distance:
-                                        min_distance = distance
-                                        closest_caption = caption_text
-                                
-                                if closest_caption and min_distance <= 3:  # Within 3 paragraphs
-                                    context = closest_caption
-                                break
-                    
-                    # If still no context, extract keywords from nearby text
-                    if not context:
-                        # Get some surrounding paragraphs for context
-                        relevant_paragraphs = []
-                        for para_idx, para in enumerate(doc.paragraphs):
-                            if rel.target_ref in para._element.xml:
-                                # Get 3 paragraphs before and after
-                                start_idx = max(0, para_idx - 3)
-                                end_idx = min(len(doc.paragraphs), para_idx + 4)
-                                relevant_paragraphs = [doc.paragraphs[j].text for j in range(start_idx, end_idx)]
-                                break
-                        
-                        context = self._extract_keywords(" ".join(relevant_paragraphs))
-                    
-                    images.append({
-                        "path": image_path,
-                        "index": i + 1,
-                        "context": context,
-                        "size": image.size
-                    })
+        The size of a DOCX image is only known once the task has probed it, so its context
+        is looked up by the record builder, which runs only for images that pass the filter.
+        """
+        paragraphs = doc.paragraphs
+        paragraph_texts = [para.text for para in paragraphs]
+        image_rels = [(i, rel) for i, rel in enumerate(doc.part._rels.values()) if "image" in rel.target_ref]
+        
+        # Map every image relationship to the paragraph that references it in one walk
+        reference_index = self._index_docx_references(paragraphs, image_rels)
 
-                except Exception as e:
-                    print(f"Failed to extract image from DOCX: {e}")
-                    continue
+        for i, rel in image_rels:
+            try:
+                image_data = rel.target_part.blob
+                img_ext = os.path.splitext(rel.target_ref)[1].lstrip(".")
+                task = partial(self._probe_and_write_image, image_data, img_ext, f"docx_image{i + 1}")
+
+                # Find the paragraph that references this image
+                para_idx = reference_index.get(rel.rId, reference_index.get(rel.target_ref))
+                build_record = partial(self._docx_image_record, i + 1, para_idx, paragraph_texts, captions)
+                yield build_record, task, "Failed to extract image from DOCX"
+
+            except Exception as e:
+                logger.warning("Failed to extract image from DOCX: %s", e)
+                continue
+
+    def _docx_image_record(self, index, para_idx, paragraph_texts, captions):
+        """Return the record for a kept DOCX image, with context from the paragraphs around it"""
+        context = ""
+        
+        if para_idx is not None:
+            # Get context from surrounding paragraphs
+            start_idx = max(0, para_idx - 1)
+            end_idx = min(len(paragraph_texts), para_idx + 2)
+            context = " ".join(paragraph_texts[start_idx:end_idx])
+            
+            # If the surrounding paragraphs are empty, look for the closest caption
+            if not context.strip():
+                context = ""
+                closest_caption = None
+                min_distance = float('inf')
+                
+                for caption_idx, caption_text in captions:
+                    distance = abs(caption_idx - para_idx)
+                    if distance < min_distance:
+                        min_distance = distance
+                        closest_caption = caption_text
+                
+                if closest_caption and min_distance <= 3:  # Within 3 paragraphs
+                    context = closest_caption
+        
+        # If still no context, extract keywords from nearby text
+        if not context:
+            relevant_paragraphs = []
+            if para_idx is not None:
+                # Get 3 paragraphs before and after
+                start_idx = max(0, para_idx - 3)
+                end_idx = min(len(paragraph_texts), para_idx + 4)
+                relevant_paragraphs = paragraph_texts[start_idx:end_idx]
+            
+            context = self._extract_keywords(" ".join(relevant_paragraphs))
+        
+        return {
+            "path": None,
+            "index": index,
+            "context": context,
+            "size": None
+        }
 
+    def _run_image_jobs(self, jobs):
+        """Run image write tasks on a bounded thread pool, keeping records in document order"""
+        images = []
+        if self.workers <= 1:
+            for record, task, error_message in jobs:
+                self._finish_image_job(images, record, task, error_message)
+            return images
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for record, task, error_message in jobs:
+                pending.append((record, pool.submit(task).result, error_message))
+                
+                # Bound in-flight work so extracted image bytes do not pile up in memory
+                if len(pending) >= self.workers * 2:
+                    self._finish_image_job(images, *pending.popleft())
+            
+            while pending:
+                self._finish_image_job(images, *pending.popleft())
         return images
 
+    def _finish_image_job(self, images, record, get_result, error_message):
+        """Complete one image job, isolating its failure from the rest of the document
+
+        record is the image's record dict, or a function building it once the image is kept.
+        """
+        try:
+            result = get_result()
+            # Tasks return None for images filtered out after probing
+            if result is None:
+                return
+            if callable(record):
+                record = record()
+        except Exception as e:
+            logger.warning("%s: %s", error_message, e)
+            return
+        
+        record.update(result)
+        images.append(record)
+        instrumentation.count("images")
+
+    def _probe_and_write_image(self, image_bytes, img_ext, name):
+        """Read the image header, skip tiny images and write the rest"""
+        from PIL import Image
+
+        # Image.open only reads the header; pixels are never decoded here
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            size = image.size
+        
+        # Skip tiny images (likely icons or bullets)
+        if size[0] < 100 or size[1] < 100:
+            return None
+        
+        return dict(self._write_image(image_bytes, img_ext, name), size=size)
+
+    def _write_image(self, image_bytes, img_ext, name):
+        """Write image bytes as-is when PowerPoint accepts the format, otherwise convert to PNG
+
+        Returns the record fields to fill in, i.e. {"path": ...}.
+        """
+        from PIL import Image
+
+        img_ext = img_ext.lower()
+        
+        if self.workspace is not None:
+            # Images stay in the job's workspace under "images/<name>.<ext>"
+            if img_ext in self.PASSTHROUGH_FORMATS:
+                image_path = f"images/{name}.{img_ext}"
+                self.workspace.put(image_path, image_bytes)
+            else:
+                image_path = f"images/{name}.png"
+                with self.workspace.writer(image_path) as f, Image.open(io.BytesIO(image_bytes)) as image:
+                    image.save(f, format="PNG")
+            return {"path": image_path}
+        
+        os.makedirs("extracted/images", exist_ok=True)
+        if img_ext in self.PASSTHROUGH_FORMATS:
+            image_path = f"extracted/images/{name}.{img_ext}"
+            with open(image_path, "wb") as f:
+                f.write(image_bytes)
+        else:
+            image_path = f"extracted/images/{name}.png"
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                image.save(image_path)
+        return {"path": image_path}
+
+    def _index_docx_references(self, paragraphs, image_rels):
+        """Map image relationship IDs and targets to the first paragraph that references them"""
+        wanted = set()
+        for _, rel in image_rels:
+            wanted.add(rel.rId)
+            wanted.add(rel.target_ref)
+
+        index = {}
+        for para_idx, para in enumerate(paragraphs):
+            # Drawings reference images through r:embed, r:link or r:id attributes
+            for element in para._element.iter():
+                for value in element.attrib.values():
+                    if value in wanted and value not in index:
+                        index[value] = para_idx
+        return index
+
     def _extract_captions(self, text):
         """Extract figure and table captions from text"""
         captions = []
@@ -0,0 +1,168 @@
+import numpy as np
+import os
+import re
+
+# Words that earn a bonus when they appear in both the slide and the image context
+MATCH_KEYWORDS = ['chart', 'graph', 'plot', 'diagram', 'screenshot', 'illustration',
+                  'figure', 'table', 'image', 'photo', 'picture']
+KEYWORD_BONUS = 0.2
+# Added to the score when a slide cites an image's figure/table number, so those pairs always win
+FIGURE_MATCH_BONUS = 10.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+FIGURE_PATTERN = re.compile(r'(figure|fig\.?|table)\s*(\d+)\b')
+
+
+def find_figure_numbers(text):
+    """Return the figure/table numbers referenced in text, in order"""
+    return [match.group(2) for match in FIGURE_PATTERN.finditer(text.lower())]
+
+
+def linear_sum_assignment(weights):
+    """Maximum-weight assignment of rows to distinct columns (Hungarian algorithm)
+
+    Returns a list of (row, column) pairs covering min(rows, columns) rows.
+    """
+    cost = -np.asarray(weights, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, columns = cost.shape
+    
+    # 1-based potentials and matching, as in the classic O(n^2 m) formulation
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    row_of = np.zeros(columns + 1, dtype=int)
+    way = np.zeros(columns + 1, dtype=int)
+    
+    for row in range(1, rows + 1):
+        row_of[0] = row
+        column = 0
+        min_reduced = np.full(columns + 1, np.inf)
+        visited = np.zeros(columns + 1, dtype=bool)
+        while True:
+            visited[column] = True
+            current_row = row_of[column]
+            free = ~visited[1:]
+            
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+            
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            
+            np.add.at(u, row_of[visited], delta)
+            v[visited] -= delta
+            min_reduced[1:][free] -= delta
+            
+            column = next_column
+            if row_of[column] == 0:
+                break
+        
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            row_of[column] = row_of[previous]
+            column = previous
+    
+    pairs = [(row_of[column] - 1, column - 1) for column in range(1, columns + 1) if row_of[column]]
+    if transposed:
+        pairs = [(row, column) for column, row in pairs]
+    return sorted(pairs)
+
+
+class ImageMatcher:
+    """TF-IDF index over image contexts, built once per deck and scored in batches"""
+
+    def __init__(self, images):
+        self.images = images
+        contexts = [self._image_context(image) for image in images]
+        
+        documents = [TOKEN_PATTERN.findall(context) for context in contexts]
+        self.vocabulary = {}
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        
+        counts = self._count_matrix(documents)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        # Smoothed IDF so terms present in every context still carry a little weight
+        self.idf = np.log((1 + len(images)) / (1 + document_frequency)) + 1
+        self.image_vectors = self._normalize(counts * self.idf)
+        self.image_keywords = self._keyword_matrix(contexts)
+        
+        # Figure/table number -> indices of images whose context cites it
+        self.figure_index = {}
+        for image_idx, context in enumerate(contexts):
+            for number in find_figure_numbers(context):
+                self.figure_index.setdefault(number, []).append(image_idx)
+
+    def figure_images(self, numbers):
+        """Return image indices whose context cites any of the figure/table numbers, in image order"""
+        matches = set()
+        for number in numbers:
+            matches.update(self.figure_index.get(number, ()))
+        return sorted(matches)
+
+    def assign(self, slide_texts, slide_figures, title_weights=None):
+        """Pick distinct images for all slides at once, maximizing the total match score
+
+        slide_figures holds the figure/table numbers cited by each slide. When
+        title_weights is given it is scored as an extra first row for the title slide.
+        Returns one image index (or None) per row.
+        """
+        weights = self.score(slide_texts) if slide_texts else np.zeros((0, len(self.images)))
+        for row, numbers in enumerate(slide_figures):
+            weights[row, self.figure_images(numbers)] += FIGURE_MATCH_BONUS
+        if title_weights is not None:
+            weights = np.vstack([np.asarray(title_weights, dtype=float), weights])
+        
+        assignment = [None] * weights.shape[0]
+        if weights.size == 0:
+            return assignment
+        
+        # A small offset makes any image better than none, as the greedy matcher behaved
+        for row, image_idx in linear_sum_assignment(weights + 1e-3):
+            assignment[row] = image_idx
+        return assignment
+
+    def score(self, slide_texts):
+        """Return a (slides x images) matrix of cosine similarity plus keyword bonuses"""
+        slide_texts = [text.lower() for text in slide_texts]
+        counts = self._count_matrix([TOKEN_PATTERN.findall(text) for text in slide_texts])
+        slide_vectors = self._normalize(counts * self.idf)
+        
+        similarity = slide_vectors @ self.image_vectors.T
+        shared_keywords = self._keyword_matrix(slide_texts) @ self.image_keywords.T
+        return similarity + KEYWORD_BONUS * shared_keywords
+
+    def _count_matrix(self, documents):
+        matrix = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(documents):
+            for token in tokens:
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    matrix[row, column] += 1
+        return matrix
+
+    def _keyword_matrix(self, texts):
+        # Substring checks, so "charts" still counts as "chart" as it always has
+        return np.array([[keyword in text for keyword in MATCH_KEYWORDS] for text in texts],
+                        dtype=np.float32).reshape(len(texts), len(MATCH_KEYWORDS))
+
+    def _normalize(self, matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def _image_context(self, image):
+        context = image.get("context", "")
+        if context is None:
+            return ""
+        elif context:
+            return context.lower()
+        # If no context, use filename as context
+        return os.path.basename(image["path"]).lower()
@@ -0,0 +1,63 @@
+import io
+import os
+
+EMU_PER_INCH = 914400
+
+
+class ImageOptimizer:
+    """Resample images to the size they are shown at and recompress them for embedding"""
+
+    def __init__(self, target_dpi=150, jpeg_quality=80, max_colors=256):
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+        # Images with at most this many distinct colours are treated as line art
+        self.max_colors = max_colors
+
+    def optimize(self, image_path, width_emu, height_emu):
+        """Return (image source, original bytes, embedded bytes) for a picture shown at the given size
+
+        The source is a BytesIO with the optimized image, or image_path itself when
+        optimizing would not make the file smaller. image_path may also be a binary file object.
+        """
+        if isinstance(image_path, str):
+            original_size = os.path.getsize(image_path)
+        else:
+            original_size = image_path.seek(0, io.SEEK_END)
+            image_path.seek(0)
+        target_width = max(1, round(width_emu / EMU_PER_INCH * self.target_dpi))
+        target_height = max(1, round(height_emu / EMU_PER_INCH * self.target_dpi))
+
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            resized = image.width > target_width or image.height > target_height
+            if resized:
+                image = image.resize((target_width, target_height), Image.LANCZOS)
+            else:
+                image.load()
+
+            buffer = io.BytesIO()
+            if self._is_line_art(image):
+                if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                    image = image.convert("RGBA")
+                image.save(buffer, "PNG", optimize=True)
+            else:
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+                image.save(buffer, "JPEG", quality=self.jpeg_quality, optimize=True, progressive=True)
+
+        if buffer.tell() >= original_size:
+            if not isinstance(image_path, str):
+                image_path.seek(0)
+            return image_path, original_size, original_size
+
+        buffer.seek(0)
+        return buffer, original_size, buffer.getbuffer().nbytes
+
+    def _is_line_art(self, image):
+        """Transparent images and images with few colours are kept lossless"""
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            return True
+        if image.mode in ("1", "P"):
+            return True
+        return image.getcolors(self.max_colors) is not None
@@ -0,0 +1,272 @@
+"""Spans, counters and peak memory for the conversion pipeline.
+
+Disabled unless INSTRUMENTATION=1 is set or configure(enabled=True) is called; while
+disabled, span() hands back a shared no-op context manager and count() returns at once.
+Per-span peak memory needs INSTRUMENTATION_TRACEMALLOC=1 (or configure(tracemalloc=True)),
+which records the Python heap peak inside each span as "peak_bytes" at the cost of slower
+allocations. tracemalloc is process-wide, so spans that overlap on other threads share
+their peaks. Without it, spans carry "process_peak_rss_bytes": the process's lifetime
+maximum RSS when the span ended, which says nothing about the span itself.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc as _tracemalloc
+from collections import deque
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+METRIC_PREFIX = "docppt"
+
+_NULL_SPAN = nullcontext()
+
+
+class Recorder:
+    """Collects finished spans and counters, and aggregates them per name"""
+
+    def __init__(self, max_spans=10000):
+        # Only the most recent spans are kept for export; aggregates cover every span
+        self.spans = deque(maxlen=max_spans)
+        self.counters = {}
+        self.aggregates = {}
+        # Highest process RSS high-water mark seen, across merged worker processes too
+        self.process_peak_rss = 0
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, span_record):
+        with self._lock:
+            self.spans.append(span_record)
+            self._unflushed = min(self._unflushed + 1, self.spans.maxlen)
+            aggregate = self.aggregates.setdefault(span_record["name"], {"count": 0, "seconds": 0.0, "peak_bytes": 0})
+            aggregate["count"] += 1
+            aggregate["seconds"] += span_record["seconds"]
+            aggregate["peak_bytes"] = max(aggregate["peak_bytes"], span_record.get("peak_bytes") or 0)
+            self.process_peak_rss = max(self.process_peak_rss, span_record.get("process_peak_rss_bytes") or 0)
+
+    def merge(self, data):
+        """Add another recorder's drained spans, aggregates and counters"""
+        with self._lock:
+            self.spans.extend(data["spans"])
+            self._unflushed = min(self._unflushed + len(data["spans"]), self.spans.maxlen)
+            # Aggregates are merged as totals, since the spans shipped may be only the most recent
+            for name, other in data["aggregates"].items():
+                aggregate = self.aggregates.setdefault(name, {"count": 0, "seconds": 0.0, "peak_bytes": 0})
+                aggregate["count"] += other["count"]
+                aggregate["seconds"] += other["seconds"]
+                aggregate["peak_bytes"] = max(aggregate["peak_bytes"], other["peak_bytes"])
+            for name, value in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.process_peak_rss = max(self.process_peak_rss, data.get("process_peak_rss_bytes") or 0)
+
+    def count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stack(self):
+        """Return this thread's stack of open spans"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def take_unflushed(self):
+        """Return the spans recorded since the previous call"""
+        with self._lock:
+            spans = list(self.spans)[len(self.spans) - self._unflushed:]
+            self._unflushed = 0
+            return spans
+
+
+class _Span:
+    def __init__(self, recorder, name, attrs):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+        # Highest absolute heap peak seen by child spans, which reset the tracemalloc peak
+        self.child_peak = 0
+
+    def __enter__(self):
+        stack = self.recorder.stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        if _settings["tracemalloc"]:
+            self.start_memory, self.outer_peak = _tracemalloc.get_traced_memory()
+            _tracemalloc.reset_peak()
+        self.started = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.recorder.stack().pop()
+
+        span_record = {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.started,
+            "seconds": seconds,
+            "thread": threading.current_thread().name,
+            "pid": os.getpid()
+        }
+        if _settings["tracemalloc"]:
+            peak = max(_tracemalloc.get_traced_memory()[1], self.child_peak)
+            span_record["peak_bytes"] = max(0, peak - self.start_memory)
+            if self.parent:
+                self.parent.child_peak = max(self.parent.child_peak, peak, self.outer_peak)
+        elif resource is not None:
+            span_record["process_peak_rss_bytes"] = _max_rss()
+        if exc_type is not None:
+            span_record["error"] = exc_type.__name__
+        if self.attrs:
+            span_record["attrs"] = self.attrs
+
+        self.recorder.record(span_record)
+        return False
+
+
+_settings = {
+    "enabled": os.getenv("INSTRUMENTATION", "0").lower() in ("1", "true", "yes"),
+    "tracemalloc": os.getenv("INSTRUMENTATION_TRACEMALLOC", "0").lower() in ("1", "true", "yes"),
+    "jsonl_path": os.getenv("INSTRUMENTATION_JSONL"),
+    "prometheus_path": os.getenv("INSTRUMENTATION_PROMETHEUS")
+}
+_recorder = Recorder()
+
+
+def configure(enabled=None, tracemalloc=None, jsonl_path=None, prometheus_path=None):
+    """Change instrumentation settings; arguments left as None keep their current value"""
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if tracemalloc is not None:
+        _settings["tracemalloc"] = tracemalloc
+    if jsonl_path is not None:
+        _settings["jsonl_path"] = jsonl_path
+    if prometheus_path is not None:
+        _settings["prometheus_path"] = prometheus_path
+
+    if _settings["enabled"] and _settings["tracemalloc"] and not _tracemalloc.is_tracing():
+        _tracemalloc.start()
+
+
+def is_enabled():
+    return _settings["enabled"]
+
+
+def span(name, **attrs):
+    """Time a block as a named span; a shared no-op context manager while disabled"""
+    if not _settings["enabled"]:
+        return _NULL_SPAN
+    return _Span(_recorder, name, attrs)
+
+
+def count(name, value=1):
+    """Add value to the named counter, e.g. pages, images, prompt_tokens or slides"""
+    if _settings["enabled"]:
+        _recorder.count(name, value)
+
+
+def snapshot():
+    """Return the retained spans, counters, per-span aggregates and the process RSS high-water mark"""
+    with _recorder._lock:
+        return {
+            "spans": list(_recorder.spans),
+            "counters": dict(_recorder.counters),
+            "aggregates": {name: dict(aggregate) for name, aggregate in _recorder.aggregates.items()},
+            "process_peak_rss_bytes": _recorder.process_peak_rss
+        }
+
+
+def drain():
+    """Return everything recorded so far and start over, e.g. to ship a worker's data to its parent"""
+    global _recorder
+    data = snapshot()
+    _recorder = Recorder(max_spans=_recorder.spans.maxlen)
+    return data
+
+
+def merge(data):
+    """Add spans, aggregates and counters drained from another process into this process's recorder"""
+    _recorder.merge(data)
+
+
+def flush():
+    """Append new spans to the JSONL file and rewrite the Prometheus file, where configured"""
+    if not _settings["enabled"]:
+        return
+    if _settings["jsonl_path"]:
+        export_jsonl(_settings["jsonl_path"], _recorder.take_unflushed())
+    if _settings["prometheus_path"]:
+        export_prometheus(_settings["prometheus_path"])
+
+
+def export_jsonl(path, spans=None):
+    """Append span records (default: all retained spans) to path, one JSON object per line"""
+    if spans is None:
+        spans = snapshot()["spans"]
+    _ensure_parent(path)
+    with open(path, "a", encoding="utf-8") as f:
+        for span_record in spans:
+            f.write(json.dumps(span_record, default=str) + "\n")
+
+
+def export_prometheus(path):
+    """Write aggregates and counters in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = [
+        f"# HELP {METRIC_PREFIX}_span_seconds_total Total time spent inside each span",
+        f"# TYPE {METRIC_PREFIX}_span_seconds_total counter"
+    ]
+    for name, aggregate in sorted(data["aggregates"].items()):
+        lines.append(f'{METRIC_PREFIX}_span_seconds_total{{span="{name}"}} {aggregate["seconds"]:.6f}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_span_calls_total Number of times each span was entered",
+        f"# TYPE {METRIC_PREFIX}_span_calls_total counter"
+    ]
+    for name, aggregate in sorted(data["aggregates"].items()):
+        lines.append(f'{METRIC_PREFIX}_span_calls_total{{span="{name}"}} {aggregate["count"]}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_span_peak_memory_bytes Highest Python heap peak inside each span (tracemalloc only)",
+        f"# TYPE {METRIC_PREFIX}_span_peak_memory_bytes gauge"
+    ]
+    for name, aggregate in sorted(data["aggregates"].items()):
+        if aggregate["peak_bytes"]:
+            lines.append(f'{METRIC_PREFIX}_span_peak_memory_bytes{{span="{name}"}} {aggregate["peak_bytes"]}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_process_peak_rss_bytes Lifetime maximum RSS of the largest recorded process",
+        f"# TYPE {METRIC_PREFIX}_process_peak_rss_bytes gauge",
+        f"{METRIC_PREFIX}_process_peak_rss_bytes {data['process_peak_rss_bytes']}"
+    ]
+    lines += [
+        f"# HELP {METRIC_PREFIX}_items_total Items processed, by kind",
+        f"# TYPE {METRIC_PREFIX}_items_total counter"
+    ]
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'{METRIC_PREFIX}_items_total{{kind="{name}"}} {value}')
+
+    # Written to a temporary file first so a scraper never reads a half-written file
+    _ensure_parent(path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def _max_rss():
+    """Return the process's peak resident set size in bytes (ru_maxrss is kilobytes on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _ensure_parent(path):
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+
+configure()
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src import instrumentation
+from src.workspace import JobWorkspace
+
+DECK_NAME = "presentation.pptx"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when submitting would exceed the queue's pending-job limit"""
+
+
+class Job:
+    """State of one background conversion, updated by the worker thread running it"""
+
+    def __init__(self, name, options, key=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.options = options
+        # Upload hash plus options; identical submissions reuse this job
+        self.key = key
+        self.state = "queued"
+        self.stage = None
+        self.slides = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.workspace = JobWorkspace()
+
+    def snapshot(self):
+        """Return a JSON-friendly copy of the job's progress"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "stage": self.stage,
+            "slides_generated": len(self.slides),
+            "last_slide": self.slides[-1]["title"] if self.slides else None,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class JobQueue:
+    """Run document conversions on a bounded worker pool shared by every app session
+
+    max_workers is the global concurrency limit; at most max_pending jobs may be queued or
+    running at once. Finished jobs, and their decks, are kept for retention seconds, and
+    only the newest max_finished of them are kept at all.
+    """
+
+    def __init__(self, max_workers=2, max_pending=50, retention=3600, max_finished=100, pipeline=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.max_finished = max_finished
+        self._pipeline = pipeline
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, name, data, target_audience, tone, custom_instructions, refresh_cache=False):
+        """Queue a document given by file name and bytes, returning its job ID
+
+        Resubmitting the same bytes with the same options returns the existing job instead of
+        converting again, unless refresh_cache is set or that job failed.
+        """
+        self._expire()
+        options = {
+            "target_audience": target_audience,
+            "tone": tone,
+            "custom_instructions": custom_instructions,
+            "refresh_cache": refresh_cache
+        }
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(dict(options, refresh_cache=False), sort_keys=True).encode("utf-8"))
+        key = digest.hexdigest()
+
+        with self._lock:
+            if not refresh_cache:
+                for job in self._jobs.values():
+                    if job.key == key and job.state != "failed":
+                        return job.id
+
+            active = sum(1 for job in self._jobs.values() if job.state in ("queued", "running"))
+            if active >= self.max_pending:
+                raise JobQueueFull(f"{active} jobs are already waiting; try again shortly")
+
+            job = Job(name, options, key)
+            self._jobs[job.id] = job
+
+        job.workspace.put(name, data)
+        self._pool.submit(self._run, job)
+        return job.id
+
+    def status(self, job_id):
+        """Return the job's progress snapshot, or None for unknown or expired jobs"""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = job.snapshot()
+            if job.state == "queued":
+                snapshot["queue_position"] = sum(
+                    1 for other in self._jobs.values() if other.state == "queued" and other.created <= job.created
+                )
+            return snapshot
+
+    def result(self, job_id):
+        """Return (deck bytes, pipeline result) for a finished job, or None if it is not done or expired"""
+        self._expire()
+        # The deck is read under the lock so _expire cannot free the workspace in between
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != "done":
+                return None
+            return job.workspace.getbuffer(DECK_NAME), job.result
+
+    def metrics(self):
+        """Return job counts by state"""
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        counts["max_workers"] = self.max_workers
+        return counts
+
+    def warm(self):
+        """Build the shared pipeline and load its LLM client now rather than on the first job"""
+        self._get_pipeline().gemini.backend.warm()
+
+    def _run(self, job):
+        job.state = "running"
+        job.started = time.time()
+
+        def on_stage(stage):
+            job.stage = stage
+
+        try:
+            options = job.options
+            with job.workspace.writer(DECK_NAME) as deck:
+                job.result = self._get_pipeline().run(
+                    job.workspace, job.name, deck,
+                    options["target_audience"], options["tone"], options["custom_instructions"],
+                    refresh_cache=options["refresh_cache"],
+                    on_stage=on_stage,
+                    on_slide=job.slides.append
+                )
+            # Only the deck is served from here on; the upload and extracted images can go
+            job.workspace.keep(DECK_NAME)
+            job.state = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+            job.workspace.cleanup()
+        finally:
+            job.finished = time.time()
+            # Publish this job's spans and the updated totals where export paths are configured
+            instrumentation.flush()
+
+    def _get_pipeline(self):
+        # Built on first use so importing this module does not configure the LLM client
+        with self._lock:
+            if self._pipeline is None:
+                from src.cache import get_default_cache, get_default_response_cache
+                from src.pipeline import DocumentPipeline
+                self._pipeline = DocumentPipeline(
+                    document_cache=get_default_cache(),
+                    response_cache=get_default_response_cache()
+                )
+            return self._pipeline
+
+    def _expire(self):
+        """Drop finished jobs past the retention period or max_finished limit and free their workspaces"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished)
+            overflow = max(0, len(finished) - self.max_finished)
+            expired = [job for idx, job in enumerate(finished) if idx < overflow or job.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            job.workspace.cleanup()
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue so jobs survive Streamlit reruns
+
+    The concurrency limit comes from JOB_MAX_WORKERS, the pending-job limit from
+    JOB_MAX_PENDING and the finished-job limit from JOB_MAX_FINISHED when set.
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(
+                max_workers=int(os.getenv("JOB_MAX_WORKERS", "2")),
+                max_pending=int(os.getenv("JOB_MAX_PENDING", "50")),
+                max_finished=int(os.getenv("JOB_MAX_FINISHED", "100"))
+            )
+        return _default_queue
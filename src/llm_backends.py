@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class TransientBackendError(Exception):
+    """A failure that is expected to succeed if the request is retried"""
+
+
+class LLMBackend(ABC):
+    """Interface for the text-generation services used by GeminiProcessor"""
+
+    model_name = None
+
+    def warm(self):
+        """Load client libraries ahead of the first request; a no-op for backends without any"""
+
+    @abstractmethod
+    def generate(self, prompt):
+        """Return the complete response text for prompt"""
+
+    def stream(self, prompt):
+        """Yield the response text in chunks; backends without streaming yield it whole"""
+        yield self.generate(prompt)
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model_name='gemini-1.5-flash', generation_config=None):
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        self._api_key = api_key
+        
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The GenerativeModel; google-generativeai is imported and configured on first use"""
+        with self._model_lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self._api_key)
+                self._model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config or None)
+            return self._model
+
+    def warm(self):
+        self.model
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+def constant_latency(seconds):
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma):
+    """Long-tailed latency, the usual shape of hosted LLM response times"""
+    return lambda rng: median * rng.lognormvariate(0, sigma)
+
+
+class LocalBackend(LLMBackend):
+    """Offline stand-in that returns deterministic responses with simulated latency and failures
+
+    latency is a number of seconds or a callable taking a random.Random (see
+    constant_latency, uniform_latency and lognormal_latency). When replay_path points at
+    a JSONL file written by RecordingBackend, recorded responses are returned for known
+    prompts.
+    """
+
+    model_name = "local-stand-in"
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None, replay_path=None, stream_chunk_chars=64):
+        self.latency = latency if callable(latency) else constant_latency(latency)
+        self.failure_rate = failure_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.replays = _load_recordings(replay_path) if replay_path else {}
+
+    def generate(self, prompt):
+        self._simulate_call()
+        return self._respond(prompt)
+
+    def stream(self, prompt):
+        self._simulate_call()
+        response = self._respond(prompt)
+        for i in range(0, len(response), self.stream_chunk_chars):
+            yield response[i:i + self.stream_chunk_chars]
+
+    def _simulate_call(self):
+        with self._rng_lock:
+            delay = self.latency(self._rng)
+            failed = self._rng.random() < self.failure_rate
+        time.sleep(max(0.0, delay))
+        if failed:
+            raise TransientBackendError("Simulated backend failure")
+
+    def _respond(self, prompt):
+        recorded = self.replays.get(prompt_fingerprint(prompt))
+        if recorded is not None:
+            return recorded
+        
+        # Slide prompts ask for a JSON array; map-step summary prompts get plain text back
+        content = _prompt_section(prompt)
+        if "JSON array" not in prompt:
+            return content[:500]
+        return json.dumps(self._fake_slides(prompt, content), indent=2)
+
+    def _fake_slides(self, prompt, content):
+        """Build a deterministic slide list from the words of the prompt's content"""
+        words = re.findall(r"[A-Za-z][A-Za-z'-]{3,}", content) or ["Summary"]
+        seed = int(prompt_fingerprint(prompt)[:8], 16)
+        slide_count = 3 + seed % 6
+        
+        slides = []
+        for i in range(slide_count):
+            start = (seed + i * 7) % len(words)
+            picked = [words[(start + j) % len(words)] for j in range(9)]
+            slides.append({
+                "title": " ".join(picked[:3]).title(),
+                "bullets": [" ".join(picked[3:6]), " ".join(picked[6:9])],
+                "image_hint": f"Figure {i + 1}"
+            })
+        return slides
+
+
+class RecordingBackend(LLMBackend):
+    """Wrap another backend and append every prompt/response pair to a JSONL file for replay"""
+
+    def __init__(self, backend, record_path):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.record_path = record_path
+        self._lock = threading.Lock()
+
+    def warm(self):
+        self.backend.warm()
+
+    def generate(self, prompt):
+        response = self.backend.generate(prompt)
+        self._record(prompt, response)
+        return response
+
+    def stream(self, prompt):
+        parts = []
+        for chunk in self.backend.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        self._record(prompt, "".join(parts))
+
+    def _record(self, prompt, response):
+        line = json.dumps({"prompt_sha256": prompt_fingerprint(prompt), "model": self.model_name, "response": response})
+        with self._lock:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def prompt_fingerprint(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def create_backend(generation_config=None):
+    """Pick the backend from LLM_BACKEND ("gemini" or "local"), optionally recording to LLM_RECORD_PATH"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    name = os.getenv("LLM_BACKEND", "gemini").lower()
+    
+    if name == "local":
+        backend = LocalBackend(
+            latency=float(os.getenv("LLM_LOCAL_LATENCY", "0")),
+            failure_rate=float(os.getenv("LLM_LOCAL_FAILURE_RATE", "0")),
+            replay_path=os.getenv("LLM_REPLAY_PATH")
+        )
+    elif name == "gemini":
+        backend = GeminiBackend(generation_config=generation_config)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND: {name}")
+    
+    record_path = os.getenv("LLM_RECORD_PATH")
+    if record_path:
+        backend = RecordingBackend(backend, record_path)
+    return backend
+
+
+def _load_recordings(path):
+    recordings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record["prompt_sha256"]] = record["response"]
+    return recordings
+
+
+def _prompt_section(prompt):
+    """Return the document text embedded in a prompt, or the whole prompt if no section marker is found"""
+    match = re.search(r"(?:Text|Section) Content:\s*(.*?)(?:\n\s*Response format|$)", prompt, re.DOTALL)
+    return match.group(1).strip() if match else prompt
@@ -1,31 +1,200 @@
-import fitz  # PyMuPDF
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import os
+import threading
+
+from src import instrumentation
+
+# PyMuPDF (fitz) and python-docx are imported where they are first needed, so TXT-only
+# jobs and short-lived workers never pay for loading them
+
+
+def source_extension(source):
+    """Return the lowercase extension of a file path or of a file object's name attribute"""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return os.path.splitext(name)[1].lower()
+
+
+def rewind(source):
+    """Return source positioned at its start; file paths are returned unchanged"""
+    if not isinstance(source, str):
+        source.seek(0)
+    return source
+
+
+def open_pdf(source):
+    """Open a PDF from a file path or a binary file object"""
+    import fitz  # PyMuPDF
+
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=rewind(source).read(), filetype="pdf")
+
+
+def _pool_context():
+    """Start method for extraction workers
+
+    The parser runs on job threads inside a threaded server, and forking a process while
+    other threads hold locks (logging, caches, the LLM scheduler) can deadlock the child.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _extract_page_range(file_path, start, stop):
+    """Extract the text of pages [start, stop) with a worker-local document handle"""
+    with open_pdf(file_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, stop)]
+
 
 class DocumentParser:
+    # Bump when parse output changes so cached results are invalidated
+    VERSION = "1"
+
+    def __init__(self, workers=None, parallel_threshold=200):
+        # Number of processes for PDF extraction; defaults to the CPU count
+        self.workers = workers or os.cpu_count() or 1
+        # PDFs with fewer pages than this are always extracted serially
+        self.parallel_threshold = parallel_threshold
+        # Worker pool, started on the first parallel extraction and reused for later documents
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def close(self):
+        """Shut down the extraction worker pool, if one was started"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
     def parse(self, file_path):
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
+        """Return the document text; file_path may also be a binary file object with a name"""
+        with instrumentation.span("parse"):
+            pages = [page["text"] for page in self.iter_pages(file_path)]
+        instrumentation.count("pages", len(pages))
+        return "".join(pages)
+
+    def iter_pages(self, file_path):
+        """Yield page dicts with page number, character offset and text"""
+        file_ext = source_extension(file_path)
+
         if file_ext == '.pdf':
-            return self._parse_pdf(file_path)
+            pages = self._iter_pdf(file_path)
         elif file_ext == '.docx':
-            return self._parse_docx(file_path)
+            pages = self._iter_docx(file_path)
         elif file_ext == '.txt':
-            return self._parse_txt(file_path)
+            pages = self._iter_txt(file_path)
         else:
             raise ValueError("Unsupported file format")
-    
-    def _parse_pdf(self, file_path):
-        text = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
-    
-    def _parse_docx(self, file_path):
-        doc = Document(file_path)
+
+        offset = 0
+        for page_num, text in enumerate(pages, start=1):
+            yield {"page": page_num, "offset": offset, "text": text}
+            offset += len(text)
+
+    def iter_chunks(self, file_path, max_chars):
+        """Yield chunks of at most max_chars characters, split on page boundaries where possible"""
+        if max_chars <= 0:
+            raise ValueError("max_chars must be positive")
+
+        parts = []
+        size = 0
+        start_page = None
+        start_offset = 0
+
+        for page in self.iter_pages(file_path):
+            text = page["text"]
+            page_offset = page["offset"]
+
+            # Flush the pending chunk if this page would overflow it
+            if parts and size + len(text) > max_chars:
+                yield self._make_chunk(parts, start_page, page["page"] - 1, start_offset)
+                parts, size = [], 0
+
+            # Pages larger than a chunk are split into max_chars slices
+            while len(text) > max_chars:
+                yield self._make_chunk([text[:max_chars]], page["page"], page["page"], page_offset)
+                text = text[max_chars:]
+                page_offset += max_chars
+
+            if not parts:
+                start_page = page["page"]
+                start_offset = page_offset
+            parts.append(text)
+            size += len(text)
+            last_page = page["page"]
+
+        if parts:
+            yield self._make_chunk(parts, start_page, last_page, start_offset)
+
+    def _make_chunk(self, parts, start_page, end_page, offset):
+        return {
+            "start_page": start_page,
+            "end_page": end_page,
+            "offset": offset,
+            "text": "".join(parts)
+        }
+
+    def _iter_pdf(self, file_path):
+        with open_pdf(file_path) as doc:
+            page_count = doc.page_count
+            parallel = self._use_parallel(page_count, file_path)
+            if not parallel:
+                yield from self._iter_pdf_doc(doc)
+
+        # Our handle is closed before the pool starts; each worker opens its own
+        if parallel:
+            yield from self._iter_pdf_parallel(file_path, page_count)
+
+    def _iter_pdf_doc(self, doc):
+        """Yield page texts from an already open PDF document"""
+        for page in doc:
+            yield page.get_text()
+
+    def _use_parallel(self, page_count, file_path=None):
+        # Worker processes reopen the file, so file objects are extracted serially here;
+        # DocumentAnalyzer can spill them to a path first
+        if file_path is not None and not isinstance(file_path, str):
+            return False
+        return self.workers > 1 and page_count >= self.parallel_threshold
+
+    def _iter_pdf_parallel(self, file_path, page_count):
+        """Extract PDF pages across a process pool, yielding them in page order"""
+        # Several ranges per worker keep the pool busy when pages vary in cost
+        range_size = max(1, -(-page_count // (self.workers * 4)))
+        starts = list(range(0, page_count, range_size))
+        stops = [min(start + range_size, page_count) for start in starts]
+
+        pool = self._get_pool()
+        try:
+            for texts in pool.map(_extract_page_range, [file_path] * len(starts), starts, stops):
+                yield from texts
+        except BrokenProcessPool:
+            # A crashed worker leaves the pool unusable; the next document starts a fresh one
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+            return self._pool
+
+    def _iter_docx(self, file_path):
+        # DOCX has no fixed pagination, so the whole body is a single page
+        from docx import Document
+
+        yield self._docx_text(Document(rewind(file_path)))
+
+    def _docx_text(self, doc):
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-    
-    def _parse_txt(self, file_path):
+
+    def _iter_txt(self, file_path):
+        if not isinstance(file_path, str):
+            yield rewind(file_path).read().decode('utf-8')
+            return
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
\ No newline at end of file
+            yield f.read()
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src import instrumentation
+from src.analyzer import DocumentAnalyzer
+from src.gemini_api import GeminiProcessor
+from src.image_extractor import ImageExtractor
+from src.image_optimizer import ImageOptimizer
+from src.parser import DocumentParser
+from src.ppt_generator import PPTGenerator
+from src.text_cleaner import TextCleaner
+
+
+class DocumentPipeline:
+    """Convert one document into a deck: analyze (parse + extract), clean, LLM and render stages"""
+
+    STAGES = ("analyze", "clean", "llm", "render")
+
+    def __init__(self, document_cache=None, response_cache=None, gemini=None, parser_workers=None,
+                 chunk_tokens=30000, fast_render=False, optimize_images=True, memo_size=32, image_workers=None):
+        # Optional DocumentCache and ResponseCache; without them every stage runs
+        self.document_cache = document_cache
+        # Cleaned text of recently seen documents by cache key, so option changes skip analyze and clean.
+        # Image records are not memoized: their files live in the document cache, which may evict them.
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.response_cache = response_cache
+        self.gemini = gemini or GeminiProcessor(chunk_tokens=chunk_tokens, response_cache=response_cache)
+        # Processes for large PDF text extraction; batch workers pass 1 to avoid nested pools.
+        # One parser is shared by every run so its worker pool stays warm between documents.
+        self.parser_workers = parser_workers
+        self.parser = DocumentParser(workers=parser_workers)
+        # Threads for probing and writing extracted images; IMAGE_WORKERS when not given
+        self.image_workers = image_workers or int(os.getenv("IMAGE_WORKERS", "1"))
+        self.fast_render = fast_render
+        self.optimize_images = optimize_images
+
+    def run(self, workspace, name, output, target_audience, tone, custom_instructions, refresh_cache=False,
+            on_stage=None, on_slide=None):
+        """Convert the document stored in workspace under name and write the deck to output
+
+        output is a path or a writable binary stream. on_stage(stage) is called as each stage
+        starts and on_slide(slide) as each slide arrives from the LLM. Returns a dict with the
+        slides, per-stage timings in seconds, and the cleaning and image reports.
+        """
+        timings = {}
+
+        def begin(stage):
+            if on_stage:
+                on_stage(stage)
+            return time.perf_counter()
+
+        start = begin("analyze")
+        memo_key = self._memo_key(workspace, name)
+        prepared = self._memo_get(memo_key)
+        cached = self.document_cache.get(memo_key) if prepared is not None else None
+        if cached is None:
+            with instrumentation.span("analyze"):
+                analysis = self._analyze(workspace, name, memo_key)
+            timings["analyze"] = time.perf_counter() - start
+
+            start = begin("clean")
+            # Drop headers, footers and other boilerplate before paying for it in tokens
+            with instrumentation.span("clean"):
+                text_content, cleaning_report = TextCleaner().clean(analysis["page_texts"])
+            timings["clean"] = time.perf_counter() - start
+            self._memo_put(memo_key, (text_content, cleaning_report))
+            images = analysis["images"]
+        else:
+            text_content, cleaning_report = prepared
+            images = cached["images"]
+            timings["analyze"] = timings["clean"] = 0.0
+            instrumentation.count("memo_hits")
+
+        start = begin("llm")
+        slides = []
+        with instrumentation.span("llm"):
+            for slide in self.gemini.stream(text_content, target_audience, tone, custom_instructions,
+                                            refresh_cache=refresh_cache):
+                slides.append(slide)
+                if on_slide:
+                    on_slide(slide)
+        timings["llm"] = time.perf_counter() - start
+
+        # Rendering starts once every slide is known, so images are assigned across the whole deck
+        start = begin("render")
+        ppt_gen = PPTGenerator(
+            image_optimizer=ImageOptimizer() if self.optimize_images else None,
+            fast_render=self.fast_render,
+            workspace=workspace
+        )
+        with instrumentation.span("render", slides=len(slides)):
+            ppt_gen.generate(slides, images, output)
+        timings["render"] = time.perf_counter() - start
+
+        return {
+            "slides": slides,
+            "timings": timings,
+            "cleaning": cleaning_report,
+            "images": ppt_gen.image_report
+        }
+
+    def _memo_key(self, workspace, name):
+        """Return the document cache key for the upload, or None when results cannot be reused"""
+        # Without the document cache, image paths point into the job's own workspace
+        if not self.document_cache or not self.memo_size:
+            return None
+        return self.document_cache.key_for(workspace.getbuffer(name))
+
+    def _memo_get(self, key):
+        if key is None:
+            return None
+        with self._memo_lock:
+            prepared = self._memo.get(key)
+            if prepared is not None:
+                self._memo.move_to_end(key)
+            return prepared
+
+    def _memo_put(self, key, prepared):
+        if key is None:
+            return
+        with self._memo_lock:
+            self._memo[key] = prepared
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def _analyze(self, workspace, name, cache_key=None):
+        """Return the document analysis, reusing the document cache when one is configured"""
+        cache = self.document_cache
+        if cache:
+            cache_key = cache_key or cache.key_for(workspace.getbuffer(name))
+            cached = cache.get(cache_key)
+            if cached:
+                return cached
+
+        analyzer = DocumentAnalyzer(
+            parser=self.parser,
+            image_extractor=ImageExtractor(workers=self.image_workers, workspace=workspace)
+        )
+        # Large PDFs are written out of memory only if parallel parsing needs a file path
+        analysis = analyzer.analyze(workspace.source(name), spill=lambda: workspace.path(name))
+        if cache:
+            return cache.put(cache_key, analysis, workspace=workspace)
+        return analysis
@@ -1,18 +1,34 @@
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.dml.color import RGBColor
+import logging
 import os
-from PIL import Image
-import re
-from difflib import SequenceMatcher
+from src import instrumentation
+
+# python-pptx, Pillow and the NumPy-based image matcher are imported inside the methods
+# that use them, so importing this module stays cheap for workers that never render
+
+logger = logging.getLogger(__name__)
 
 class PPTGenerator:
-    def __init__(self):
+    def __init__(self, image_optimizer=None, fast_render=False, workspace=None):
         self.used_images = set()
+        # Optional JobWorkspace holding extracted images; other image paths are read from disk
+        self.workspace = workspace
+        # Stamp content slides from XML templates instead of the python-pptx object API
+        self.fast_render = fast_render
+        self._slide_builder = None
+        # Optional ImageOptimizer used to downsample pictures to their placement size
+        self.image_optimizer = image_optimizer
+        self.image_report = {"images": 0, "original_bytes": 0, "embedded_bytes": 0, "saved_bytes": 0}
+        self._matcher = None
     
     def generate(self, slides_content, images, output_path):
-        print(f"Number of images available: {len(images)}")
+        """Build and save the deck; slides_content may be a list or a stream of slide dicts
+
+        output_path may also be a writable binary stream, e.g. a BytesIO for a download.
+        """
+        from pptx import Presentation
+        from pptx.util import Inches
+
+        logger.info("Number of images available: %d", len(images))
         prs = Presentation()
         
         # Set slide dimensions (16:9 aspect ratio)
@@ -25,19 +41,40 @@ class PPTGenerator:
         title_shape = title_slide.shapes.title
         subtitle_shape = title_slide.placeholders[1] if len(title_slide.placeholders) > 1 else None
 
-        if slides_content:
-            title_shape.text = slides_content[0]["title"]
+        # Slides may still be arriving from a stream, so only the first is read up front
+        slides_iter = iter(slides_content)
+        first_slide = next(slides_iter, None)
+
+        if first_slide:
+            title_shape.text = first_slide["title"]
             if subtitle_shape:
                 subtitle_shape.text = "Document Summary"
 
-        # Find a suitable image for the title slide
-        title_image = self._find_title_image(images)
+        # When all slides are known up front, assign images to every slide in one pass
+        assignment = None
+        if isinstance(slides_content, list) and images:
+            with instrumentation.span("render.assign_images", slides=len(slides_content), images=len(images)):
+                assignment = self._assign_images(slides_content[1:], images)
+            title_image = images[assignment[0]] if assignment[0] is not None else None
+        else:
+            # Find a suitable image for the title slide
+            title_image = self._find_title_image(images)
+        
         if title_image:
-            self._add_image_to_slide(title_slide, title_image, is_title_slide=True)
+            self._add_image_to_slide(title_slide, title_image, (prs.slide_width, prs.slide_height),
+                                     is_title_slide=True)
+
+        # Created after the title slide so its slide counters start past it
+        if self.fast_render:
+            from src.slide_builder import BulkSlideBuilder
+            self._slide_builder = BulkSlideBuilder(prs)
+        else:
+            self._slide_builder = None
 
         # Content Slides
-        for idx, slide_content in enumerate(slides_content[1:], 1):
-            print(f"\nProcessing slide {idx}: {slide_content['title']}")
+        for idx, slide_content in enumerate(slides_iter, 1):
+            logger.debug("Processing slide %d: %s", idx, slide_content['title'])
+            instrumentation.count("slides")
             
             # Safely get image_hint and bullets
             image_hint = slide_content.get("image_hint", "")
@@ -50,88 +87,124 @@ class PPTGenerator:
             if bullets is None:
                 bullets = []
             
-            matching_image = self._find_matching_image(image_hint, images, slide_content["title"], bullets)
-            
-            # Use different layouts based on whether we have an image
-            if matching_image:
-                # Two Content layout (for text + image)
-                slide_layout = prs.slide_layouts[3]  # Usually layout 3 is for two content
+            if assignment is not None:
+                image_idx = assignment[idx]
+                matching_image = images[image_idx] if image_idx is not None else None
             else:
-                # Title and Content layout (just text)
-                slide_layout = prs.slide_layouts[1]
-            
-            slide = prs.slides.add_slide(slide_layout)
+                matching_image = self._find_matching_image(image_hint, images, slide_content["title"], bullets)
             
-            # Add title
-            if slide.shapes.title:
-                title_shape = slide.shapes.title
-                title_shape.text = slide_content["title"]
-                
-                # Format title text
-                for paragraph in title_shape.text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.size = Pt(40)
-                        run.font.bold = True
-            
-            # Add content based on layout
-            if matching_image:
-                # Two content placeholders - left for text, right for image
-                placeholders = [shape for shape in slide.placeholders 
-                               if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER
-                               and shape.placeholder_format.idx != 0]  # Skip title placeholder
-                
-                if len(placeholders) >= 2:
-                    # Left placeholder for text
-                    text_placeholder = placeholders[0]
-                    text_frame = text_placeholder.text_frame
-                    text_frame.clear()
-                    
-                    for bullet in bullets:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet.strip()
-                        p.level = 0
-                        # Format bullet text
-                        for run in p.runs:
-                            run.font.size = Pt(24)
-                    
-                    # Right placeholder for image
-                    self._add_image_to_placeholder(slide, placeholders[1], matching_image)
-                    self.used_images.add(matching_image["path"])
-                    print(f"Added image: {matching_image['path']}")
-                else:
-                    # Fallback if layout doesn't have expected placeholders
-                    self._add_content_with_custom_image(slide, slide_content, matching_image)
+            if self._slide_builder:
+                self._add_bulk_slide(slide_content, bullets, matching_image)
             else:
-                # Just add text content
-                content_shape = None
-                for shape in slide.placeholders:
-                    if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER and shape.placeholder_format.idx != 0:
-                        content_shape = shape
-                        break
-                
-                if content_shape:
-                    text_frame = content_shape.text_frame
-                    text_frame.clear()
-                    
-                    for bullet in bullets:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet.strip()
-                        p.level = 0
-                        # Format bullet text
-                        for run in p.runs:
-                            run.font.size = Pt(24)
+                self._add_content_slide(prs, slide_content, bullets, matching_image)
 
         # Save the presentation
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        prs.save(output_path)
-        print(f"\nPresentation saved to: {output_path}")
-        print(f"Used {len(self.used_images)} images out of {len(images)} available")
+        if isinstance(output_path, str):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with instrumentation.span("render.save"):
+            prs.save(output_path)
+        logger.info("Presentation saved to: %s", getattr(output_path, 'name', output_path))
+        logger.info("Used %d images out of %d available", len(self.used_images), len(images))
+        if self.image_optimizer:
+            report = self.image_report
+            logger.info("Image optimization saved %d bytes (%d -> %d) across %d images",
+                        report['saved_bytes'], report['original_bytes'], report['embedded_bytes'], report['images'])
+
+    def _add_content_slide(self, prs, slide_content, bullets, matching_image):
+        """Add one content slide through the python-pptx object API"""
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
+        from pptx.util import Pt
+
+        # Use different layouts based on whether we have an image
+        if matching_image:
+            # Two Content layout (for text + image)
+            slide_layout = prs.slide_layouts[3]  # Usually layout 3 is for two content
+        else:
+            # Title and Content layout (just text)
+            slide_layout = prs.slide_layouts[1]
+
+        slide = prs.slides.add_slide(slide_layout)
+
+        # Add title
+        if slide.shapes.title:
+            title_shape = slide.shapes.title
+            title_shape.text = slide_content["title"]
+
+            # Format title text
+            for paragraph in title_shape.text_frame.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = Pt(40)
+                    run.font.bold = True
+
+        # Add content based on layout
+        if matching_image:
+            # Two content placeholders - left for text, right for image
+            placeholders = [shape for shape in slide.placeholders 
+                           if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER
+                           and shape.placeholder_format.idx != 0]  # Skip title placeholder
+
+            if len(placeholders) >= 2:
+                # Left placeholder for text
+                text_placeholder = placeholders[0]
+                text_frame = text_placeholder.text_frame
+                text_frame.clear()
+
+                for bullet in bullets:
+                    p = text_frame.add_paragraph()
+                    p.text = bullet.strip()
+                    p.level = 0
+                    # Format bullet text
+                    for run in p.runs:
+                        run.font.size = Pt(24)
+
+                # Right placeholder for image
+                self._add_image_to_placeholder(slide, placeholders[1], matching_image)
+                self.used_images.add(matching_image["path"])
+                logger.debug("Added image: %s", matching_image['path'])
+            else:
+                # Fallback if layout doesn't have expected placeholders
+                self._add_content_with_custom_image(slide, slide_content, matching_image,
+                                                    (prs.slide_width, prs.slide_height))
+        else:
+            # Just add text content
+            content_shape = None
+            for shape in slide.placeholders:
+                if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER and shape.placeholder_format.idx != 0:
+                    content_shape = shape
+                    break
+
+            if content_shape:
+                text_frame = content_shape.text_frame
+                text_frame.clear()
+
+                for bullet in bullets:
+                    p = text_frame.add_paragraph()
+                    p.text = bullet.strip()
+                    p.level = 0
+                    # Format bullet text
+                    for run in p.runs:
+                        run.font.size = Pt(24)
+
+    def _add_bulk_slide(self, slide_content, bullets, matching_image):
+        """Add one content slide by stamping a pre-formatted layout template"""
+        layout_idx = 3 if matching_image else 1
+        slide, placeholders = self._slide_builder.add_slide(layout_idx, slide_content["title"], bullets)
+        
+        if matching_image:
+            if len(placeholders) >= 2:
+                self._add_image_to_placeholder(slide, placeholders[1], matching_image)
+                self.used_images.add(matching_image["path"])
+                logger.debug("Added image: %s", matching_image['path'])
+            else:
+                prs = self._slide_builder.prs
+                self._add_content_with_custom_image(slide, slide_content, matching_image,
+                                                    (prs.slide_width, prs.slide_height))
 
     def _add_image_to_placeholder(self, slide, placeholder, image_info):
         """Add image to a placeholder, maintaining aspect ratio"""
         img_path = image_info["path"]
-        if not os.path.exists(img_path):
-            print(f"Image file not found: {img_path}")
+        if not self._image_exists(img_path):
+            logger.warning("Image file not found: %s", img_path)
             return
         
         try:
@@ -140,51 +213,82 @@ class PPTGenerator:
             ph_height = placeholder.height
             
             # Calculate image dimensions to maintain aspect ratio
-            with Image.open(img_path) as img:
-                img_width, img_height = img.size
-                aspect_ratio = img_width / img_height
-                
-                if (ph_width / ph_height) > aspect_ratio:
-                    # Placeholder is wider than image proportionally
-                    new_height = ph_height
-                    new_width = int(new_height * aspect_ratio)
-                else:
-                    # Placeholder is taller than image proportionally
-                    new_width = ph_width
-                    new_height = int(new_width / aspect_ratio)
+            img_width, img_height = self._get_image_size(image_info)
+            aspect_ratio = img_width / img_height
+            
+            if (ph_width / ph_height) > aspect_ratio:
+                # Placeholder is wider than image proportionally
+                new_height = ph_height
+                new_width = int(new_height * aspect_ratio)
+            else:
+                # Placeholder is taller than image proportionally
+                new_width = ph_width
+                new_height = int(new_width / aspect_ratio)
             
             # Center the image in the placeholder
             left = int(placeholder.left + (ph_width - new_width) / 2)
             top = int(placeholder.top + (ph_height - new_height) / 2)
             
             # Add image to slide (not to the placeholder directly)
-            slide.shapes.add_picture(img_path, left, top, width=new_width, height=new_height)
+            slide.shapes.add_picture(self._picture_source(img_path, new_width, new_height),
+                                     left, top, width=new_width, height=new_height)
             
         except Exception as e:
-            print(f"Failed to add image to placeholder: {str(e)}")
+            logger.warning("Failed to add image to placeholder: %s", e)
+
+    def _image_exists(self, img_path):
+        return (self.workspace is not None and img_path in self.workspace) or os.path.exists(img_path)
+
+    def _open_image(self, img_path):
+        """Return a file object for workspace images, or the path itself for images on disk"""
+        if self.workspace is not None and img_path in self.workspace:
+            return self.workspace.source(img_path)
+        return img_path
+
+    def _picture_source(self, img_path, width, height):
+        """Return the image to embed, downsampled for its placement when an optimizer is set"""
+        if not self.image_optimizer:
+            return self._open_image(img_path)
+        
+        with instrumentation.span("render.optimize_image"):
+            source, original_bytes, embedded_bytes = self.image_optimizer.optimize(self._open_image(img_path), width, height)
+        self.image_report["images"] += 1
+        self.image_report["original_bytes"] += original_bytes
+        self.image_report["embedded_bytes"] += embedded_bytes
+        self.image_report["saved_bytes"] += original_bytes - embedded_bytes
+        return source
+
+    def _get_image_size(self, image_info):
+        """Return (width, height) in pixels, reading the file header only if the extractor did not record it"""
+        if image_info.get("size"):
+            return image_info["size"]
+        from PIL import Image
+
+        with Image.open(self._open_image(image_info["path"])) as img:
+            return img.size
+
+    def _add_image_to_slide(self, slide, image_info, slide_size, is_title_slide=False):
+        """Add image to slide with custom positioning; slide_size is the presentation's (width, height)"""
+        from pptx.util import Inches
 
-    def _add_image_to_slide(self, slide, image_info, is_title_slide=False):
-        """Add image to slide with custom positioning"""
         img_path = image_info["path"]
-        if not os.path.exists(img_path):
-            print(f"Image file not found: {img_path}")
+        if not self._image_exists(img_path):
+            logger.warning("Image file not found: %s", img_path)
             return
         
         try:
-            # Get slide dimensions
-            slide_width = slide.slide_layout.width
-            slide_height = slide.slide_layout.height
+            # Slides and layouts carry no size of their own; it is set on the presentation
+            slide_width, slide_height = slide_size
             
             if is_title_slide:
                 # For title slide, place image at bottom right
                 max_width = Inches(5)  # Maximum width for the image
                 
-                with Image.open(img_path) as img:
-                    img_width, img_height = img.size
-                    aspect_ratio = img_width / img_height
-                    
-                    new_width = max_width
-                    new_height = int(new_width / aspect_ratio)
+                img_width, img_height = self._get_image_size(image_info)
+                aspect_ratio = img_width / img_height
+                
+                new_width = max_width
+                new_height = int(new_width / aspect_ratio)
                     
                 # Position at bottom right with some margin
                 left = int(slide_width - new_width - Inches(0.5))
@@ -194,32 +298,34 @@ class PPTGenerator:
                 # For content slides, place on right half
                 max_width = int(slide_width / 2 - Inches(0.5))
                 
-                with Image.open(img_path) as img:
-                    img_width, img_height = img.size
-                    aspect_ratio = img_width / img_height
-                    
-                    new_width = max_width
-                    new_height = int(new_width / aspect_ratio)
-                    
-                    if new_height > slide_height - Inches(2):
-                        # Too tall, scale by height instead
-                        new_height = int(slide_height - Inches(2))
-                        new_width = int(new_height * aspect_ratio)
+                img_width, img_height = self._get_image_size(image_info)
+                aspect_ratio = img_width / img_height
+                
+                new_width = max_width
+                new_height = int(new_width / aspect_ratio)
+                
+                if new_height > slide_height - Inches(2):
+                    # Too tall, scale by height instead
+                    new_height = int(slide_height - Inches(2))
+                    new_width = int(new_height * aspect_ratio)
                 
                 # Position on right half
                 left = int(slide_width / 2 + Inches(0.25))
                 top = int(Inches(1.5))
             
             # Add image to slide
-            slide.shapes.add_picture(img_path, left, top, width=new_width, height=new_height)
+            slide.shapes.add_picture(self._picture_source(img_path, new_width, new_height),
+                                     left, top, width=new_width, height=new_height)
             self.used_images.add(img_path)
-            print(f"Added image: {img_path}")
+            logger.debug("Added image: %s", img_path)
             
         except Exception as e:
-            print(f"Failed to add image to slide: {str(e)}")
+            logger.warning("Failed to add image to slide: %s", e)
 
-    def _add_content_with_custom_image(self, slide, slide_content, image_info):
+    def _add_content_with_custom_image(self, slide, slide_content, image_info, slide_size):
         """Add text content on left side and image on right side manually"""
+        from pptx.util import Inches, Pt
+
         # Add bullets as text box on left side
         left = int(Inches(0.5))
         top = int(Inches(1.5))
@@ -245,7 +351,7 @@ class PPTGenerator:
             p.space_after = Pt(12)
         
         # Add image on right side
-        self._add_image_to_slide(slide, image_info)
+        self._add_image_to_slide(slide, image_info, slide_size)
 
     def _find_title_image(self, images):
         """Find a suitable image for the title slide"""
@@ -282,6 +388,68 @@ class PPTGenerator:
             
         return largest_image
 
+    def _assign_images(self, content_slides, images):
+        """Assign distinct images to the title slide and all content slides at once
+
+        Returns image indices (or None) with the title slide first.
+        """
+        slide_contexts = []
+        slide_figures = []
+        for slide in content_slides:
+            image_hint = (slide.get("image_hint") or "").lower()
+            bullets = slide.get("bullets") or []
+            slide_contexts.append(self._slide_context(slide.get("title"), bullets))
+            slide_figures.append(self._slide_figure_numbers(image_hint, slide.get("title") or "", bullets))
+        
+        return self._get_matcher(images).assign(slide_contexts, slide_figures, self._title_image_weights(images))
+
+    def _title_image_weights(self, images):
+        """Score images for the title slide with the same preferences as _find_title_image"""
+        logo_keywords = ['logo', 'title', 'cover', 'header', 'main']
+        areas = [image["size"][0] * image["size"][1] if image.get("size") else 0 for image in images]
+        max_area = max(areas) or 1
+        
+        weights = []
+        for image_idx, image in enumerate(images):
+            context = (image.get("context") or "").lower()
+            if any(keyword in context for keyword in logo_keywords):
+                # Logo-like images come first, earlier ones preferred
+                weights.append(3.0 - image_idx * 1e-6)
+            else:
+                # Otherwise larger images make better title images
+                weights.append(areas[image_idx] / max_area)
+        return weights
+
+    def _slide_figure_numbers(self, image_hint, slide_title, bullets):
+        """Collect figure/table numbers from the image hint and the slide text"""
+        from src.image_matcher import find_figure_numbers
+
+        fig_numbers = []
+        if image_hint:
+            # Only the first reference in the hint is used
+            fig_numbers.extend(find_figure_numbers(image_hint)[:1])
+        
+        for text in [slide_title] + (bullets if bullets else []):
+            if text is None:
+                continue
+            fig_numbers.extend(find_figure_numbers(text))
+        return fig_numbers
+
+    def _get_matcher(self, images):
+        """Return the similarity index for this image list, building it once per deck"""
+        if self._matcher is None or self._matcher.images is not images:
+            from src.image_matcher import ImageMatcher
+            self._matcher = ImageMatcher(images)
+        return self._matcher
+
+    def _slide_context(self, slide_title, bullets):
+        """Combine title and bullets into the lowercase text used for matching"""
+        if bullets:
+            bullet_text = " ".join(str(b) for b in bullets if b is not None)
+        else:
+            bullet_text = ""
+        return (slide_title or "").lower() + " " + bullet_text.lower()
+
     def _find_matching_image(self, image_hint, images, slide_title, bullets):
         """Find the most contextually relevant image for the slide"""
         if not images:
@@ -292,81 +460,28 @@ class PPTGenerator:
             slide_title = ""
             
         # Create a combined context from title and bullets for better matching
-        if bullets:
-            bullet_text = " ".join(str(b) for b in bullets if b is not None)
-        else:
-            bullet_text = ""
-            
-        slide_context = slide_title.lower() + " " + bullet_text.lower()
+        slide_context = self._slide_context(slide_title, bullets)
         
-        # Extract figure/table numbers from hints
-        fig_numbers = []
-        if image_hint:
-            fig_match = re.search(r'(figure|fig\.?|table)\s*(\d+)', image_hint)
-            if fig_match:
-                fig_numbers.append(fig_match.group(2))
-        
-        # Extract figure/table numbers from slide content
-        for text in [slide_title] + (bullets if bullets else []):
-            if text is None:
-                continue
-            matches = re.finditer(r'(figure|fig\.?|table)\s*(\d+)', text.lower())
-            for match in matches:
-                fig_numbers.append(match.group(2))
+        fig_numbers = self._slide_figure_numbers(image_hint, slide_title, bullets)
+        matcher = self._get_matcher(images)
         
         best_match = None
         best_score = 0
         
-        def text_similarity(text1, text2):
-            """Calculate the similarity between two text strings"""
-            if not text1 or not text2:
-                return 0
-            return SequenceMatcher(None, text1, text2).ratio()
-        
         # First try to match by figure/table number
-        if fig_numbers:
-            for image in images:
-                if image["path"] in self.used_images:
-                    continue
-                    
-                context = image.get("context", "")
-                if context is None:
-                    context = ""
-                else:
-                    context = context.lower()
-                    
-                for num in fig_numbers:
-                    if re.search(rf'(figure|fig\.?|table)\s*{num}\b', context):
-                        return image
+        for image_idx in matcher.figure_images(fig_numbers):
+            if images[image_idx]["path"] not in self.used_images:
+                return images[image_idx]
         
-        # If no exact figure match, try semantic matching
-        for image in images:
+        # If no exact figure match, use TF-IDF similarity plus keyword bonuses
+        scores = matcher.score([slide_context])[0]
+        
+        for image_idx, image in enumerate(images):
             if image["path"] in self.used_images:
                 continue
-                
-            context = image.get("context", "")
-            if context is None:
-                context = ""
-            elif context:
-                context = context.lower()
-            else:
-                # If no context, use filename as context
-                context = os.path.basename(image["path"]).lower()
-            
-            # Calculate similarity score
-            similarity = text_similarity(slide_context, context)
-            
-            # Give bonus points for keywords
-            keywords = ['chart', 'graph', 'plot', 'diagram', 'screenshot', 'illustration', 
-                       'figure', 'table', 'image', 'photo', 'picture']
-            
-            # Check if any keywords appear in both slide context and image context
-            for keyword in keywords:
-                if keyword in slide_context and keyword in context:
-                    similarity += 0.2
             
-            if similarity > best_score:
-                best_score = similarity
+            if scores[image_idx] > best_score:
+                best_score = scores[image_idx]
                 best_match = image
         
         # Only use images with a reasonable match score
@@ -0,0 +1,181 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from src.llm_backends import TransientBackendError
+
+# Exception class names raised by google-api-core for throttling and server-side hiccups
+TRANSIENT_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "DeadlineExceeded", "InternalServerError", "Aborted"
+}
+
+
+def is_transient(error):
+    """Return True for errors that are worth retrying"""
+    if isinstance(error, (TransientBackendError, TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+class TokenBucket:
+    """Refills at rate_per_minute and blocks callers until enough capacity is available"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """Process-wide gate for LLM calls: rate limits, a concurrency cap and retries with backoff"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=1000000, max_concurrency=4,
+                 max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = threading.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._queue_depth = 0
+        self._in_flight = 0
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, fn, tokens=0):
+        """Run fn() under the rate limits, retrying transient errors, and return its result"""
+        attempt = 0
+        while True:
+            try:
+                with self.slot(tokens):
+                    return fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            self._backoff(attempt)
+            attempt += 1
+
+    def stream(self, fn, tokens=0):
+        """Yield from fn() under the rate limits; retries only happen before the first chunk"""
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.slot(tokens):
+                    for chunk in fn():
+                        started = True
+                        yield chunk
+                    return
+            except Exception as e:
+                # Chunks already handed to the caller cannot be taken back
+                if started:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                if not self._should_retry(e, attempt):
+                    raise
+            self._backoff(attempt)
+            attempt += 1
+
+    @contextmanager
+    def slot(self, tokens=0):
+        """Wait for a concurrency slot and rate-limit capacity, holding the slot for the block"""
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._queue_depth += 1
+        try:
+            self._slots.acquire()
+            try:
+                self.request_bucket.acquire(1)
+                self.token_bucket.acquire(tokens)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            waited = time.perf_counter() - queued_at
+            with self._lock:
+                self._queue_depth -= 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+        with self._lock:
+            self._in_flight += 1
+            self._requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def metrics(self):
+        """Return queue depth, retry counts and time spent waiting for capacity"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue_depth,
+                "in_flight": self._in_flight,
+                "requests": self._requests,
+                "retries": self._retries,
+                "failures": self._failures,
+                "wait_seconds_total": round(self._wait_total, 3),
+                "wait_seconds_max": round(self._wait_max, 3),
+                "wait_seconds_avg": round(self._wait_total / self._requests, 3) if self._requests else 0.0
+            }
+
+    def _should_retry(self, error, attempt):
+        retry = is_transient(error) and attempt < self.max_retries
+        with self._lock:
+            if retry:
+                self._retries += 1
+            else:
+                self._failures += 1
+        return retry
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter so throttled callers do not retry in lockstep
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the scheduler shared by every LLM call in this process
+
+    Limits come from LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE and
+    LLM_MAX_CONCURRENCY when set.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler(
+                requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+                tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+            )
+        return _default_scheduler
@@ -0,0 +1,137 @@
+from copy import deepcopy
+import re
+
+from lxml import etree
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.parts.slide import SlidePart
+from pptx.util import Pt
+
+# Sentinel text written into templates and replaced when a slide is stamped out
+TITLE_MARKER = "__SLIDE_TITLE__"
+BULLET_MARKER = "__SLIDE_BULLET__"
+
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+# Control characters are not allowed in XML text nodes; python-pptx writes them as "_x0007_"
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f]')
+
+
+class BulkSlideBuilder:
+    """Stamp out title-and-bullets slides from pre-formatted per-layout XML templates
+
+    Each layout is rendered once through python-pptx with the deck's fonts applied;
+    later slides are deep copies of that XML with the text swapped in, registered
+    directly with the presentation part.
+    """
+
+    def __init__(self, prs, title_size=Pt(40), bullet_size=Pt(24)):
+        self.prs = prs
+        self.title_size = title_size
+        self.bullet_size = bullet_size
+        self._templates = {}
+        
+        sldIdLst = prs.slides._sldIdLst
+        self._next_slide_number = len(sldIdLst) + 1
+        self._next_slide_id = max([sldId.id for sldId in sldIdLst.sldId_lst] + [255]) + 1
+
+    def add_slide(self, layout_idx, title, bullets):
+        """Add a slide with title and bullets; returns (slide, non-title placeholders of the template)"""
+        element, placeholders, layout_part = self._get_template(layout_idx)
+        element = deepcopy(element)
+        
+        title_text = self._find_marker(element, TITLE_MARKER)
+        if title_text is not None:
+            self._set_frame_text(title_text, title)
+        
+        bullet_text = self._find_marker(element, BULLET_MARKER)
+        if bullet_text is not None:
+            bullet_paragraph = bullet_text.getparent().getparent()
+            for bullet in bullets:
+                paragraph = deepcopy(bullet_paragraph)
+                self._set_text(self._find_marker(paragraph, BULLET_MARKER), bullet.strip())
+                bullet_paragraph.addprevious(paragraph)
+            bullet_paragraph.getparent().remove(bullet_paragraph)
+        
+        partname = PackURI("/ppt/slides/slide%d.xml" % self._next_slide_number)
+        slide_part = SlidePart(partname, CT.PML_SLIDE, self.prs.part.package, element)
+        slide_part.relate_to(layout_part, RT.SLIDE_LAYOUT)
+        
+        # New rIds and slide ids come from counters instead of rescanning every existing slide
+        rId = self.prs.part.rels._add_relationship(RT.SLIDE, slide_part)
+        self.prs.slides._sldIdLst._add_sldId(id=self._next_slide_id, rId=rId)
+        self._next_slide_number += 1
+        self._next_slide_id += 1
+        
+        return slide_part.slide, placeholders
+
+    def _get_template(self, layout_idx):
+        if layout_idx not in self._templates:
+            self._templates[layout_idx] = self._build_template(layout_idx)
+        return self._templates[layout_idx]
+
+    def _build_template(self, layout_idx):
+        """Render one formatted slide for the layout on a part that is never added to the deck"""
+        layout = self.prs.slide_layouts[layout_idx]
+        partname = PackURI("/ppt/slides/template%d.xml" % layout_idx)
+        slide = SlidePart.new(partname, self.prs.part.package, layout.part).slide
+        slide.shapes.clone_layout_placeholders(layout)
+        
+        if slide.shapes.title:
+            title_shape = slide.shapes.title
+            title_shape.text = TITLE_MARKER
+            for paragraph in title_shape.text_frame.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = self.title_size
+                    run.font.bold = True
+        
+        placeholders = [shape for shape in slide.placeholders
+                        if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER
+                        and shape.placeholder_format.idx != 0]
+        if placeholders:
+            text_frame = placeholders[0].text_frame
+            text_frame.clear()
+            p = text_frame.add_paragraph()
+            p.text = BULLET_MARKER
+            p.level = 0
+            for run in p.runs:
+                run.font.size = self.bullet_size
+        
+        return slide._element, placeholders, layout.part
+
+    def _find_marker(self, element, marker):
+        for text in element.iter(A_NS + "t"):
+            if text.text == marker:
+                return text
+        return None
+
+    def _set_frame_text(self, text_element, text):
+        """Fill a marker run like TextFrame.text: one paragraph per newline, \\v as a line break"""
+        paragraph = text_element.getparent().getparent()
+        template = deepcopy(paragraph)
+        lines = str(text).split("\n")
+        self._set_text(text_element, lines[0])
+        
+        for line in lines[1:]:
+            next_paragraph = deepcopy(template)
+            self._set_text(next(next_paragraph.iter(A_NS + "t")), line)
+            paragraph.addnext(next_paragraph)
+            paragraph = next_paragraph
+
+    def _set_text(self, text_element, text):
+        """Replace a marker run like _Paragraph.text: newlines and \\v become line breaks,
+        empty segments get no run and control characters are escaped"""
+        run = text_element.getparent()
+        anchor = run
+        for idx, line in enumerate(re.split(r'[\n\v]', str(text))):
+            if idx > 0:
+                line_break = etree.Element(A_NS + "br")
+                anchor.addnext(line_break)
+                anchor = line_break
+            if line:
+                next_run = deepcopy(run)
+                next_run.find(A_NS + "t").text = CONTROL_CHARS.sub(lambda match: "_x%04X_" % ord(match.group()), line)
+                anchor.addnext(next_run)
+                anchor = next_run
+        run.getparent().remove(run)
@@ -0,0 +1,110 @@
+import re
+from collections import Counter
+
+from src.tokens import estimate_tokens
+
+PAGE_NUMBER_PATTERN = re.compile(r'^(page\s*)?[-–]?\s*\d+\s*[-–]?(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+TOC_LINE_PATTERN = re.compile(r'(\.\s*){4,}\d+$')
+
+
+class TextCleaner:
+    """Strip running headers, footers, page numbers and other boilerplate before prompting"""
+
+    def __init__(self, repeat_ratio=0.5, min_repeat_pages=3, min_duplicate_chars=60):
+        # A line on at least this share of pages (and min_repeat_pages) is a header or footer
+        self.repeat_ratio = repeat_ratio
+        self.min_repeat_pages = min_repeat_pages
+        # Longer lines seen before (e.g. repeated disclaimers) are only kept once
+        self.min_duplicate_chars = min_duplicate_chars
+
+    def clean(self, page_texts):
+        """Return (cleaned text, report) for a list of page texts"""
+        pages = []
+        for page_text in page_texts:
+            lines = [self._normalize(line) for line in page_text.splitlines()]
+            pages.append(lines)
+        boilerplate = self._repeated_lines(pages)
+        
+        kept = []
+        seen_long = set()
+        removed = 0
+        for lines in pages:
+            edge_lines = self._edge_lines(lines)
+            for line_idx, line in enumerate(lines):
+                if not line:
+                    # Collapse runs of blank lines into one
+                    if kept and kept[-1]:
+                        kept.append("")
+                    continue
+                
+                at_edge = line_idx in edge_lines
+                if self._is_low_information(line, at_edge) or self._line_keys(line, at_edge) & boilerplate:
+                    removed += 1
+                    continue
+                
+                if len(line) >= self.min_duplicate_chars:
+                    if line in seen_long:
+                        removed += 1
+                        continue
+                    seen_long.add(line)
+                
+                kept.append(line)
+        
+        text = "\n".join(kept).strip()
+        tokens_before = estimate_tokens("".join(page_texts))
+        tokens_after = estimate_tokens(text)
+        report = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "reduction": round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+            "lines_removed": removed
+        }
+        return text, report
+
+    def _repeated_lines(self, pages):
+        """Find header and footer lines that recur across many pages
+
+        Only lines at the top or bottom of a page count, so short body lines such as table
+        row labels survive; repeated body paragraphs are left to the long-line dedupe. Edge
+        lines also match with their digits ignored, so running headers and footers that
+        carry a page counter are caught.
+        """
+        if len(pages) < self.min_repeat_pages:
+            return set()
+        
+        counts = Counter()
+        for lines in pages:
+            edge_lines = self._edge_lines(lines)
+            keys = set()
+            for line_idx, line in enumerate(lines):
+                if line:
+                    keys |= self._line_keys(line, line_idx in edge_lines)
+            counts.update(keys)
+        
+        threshold = max(self.min_repeat_pages, self.repeat_ratio * len(pages))
+        return {key for key, count in counts.items() if count >= threshold}
+
+    def _edge_lines(self, lines, depth=2):
+        """Indices of the first and last few non-empty lines, where headers and footers live"""
+        filled = [line_idx for line_idx, line in enumerate(lines) if line]
+        return set(filled[:depth] + filled[-depth:])
+
+    def _line_keys(self, line, at_edge):
+        if not at_edge:
+            return set()
+        return {line.lower(), "#edge:" + re.sub(r'\d+', '#', line.lower())}
+
+    def _is_low_information(self, line, at_edge=False):
+        """Page numbers, table-of-contents entries and lines of pure punctuation
+
+        Numeric lines such as "12%" or "$4.2M" are kept; a bare number only counts as a
+        page number at the top or bottom of a page, since elsewhere it is usually table data.
+        """
+        if TOC_LINE_PATTERN.search(line):
+            return True
+        if PAGE_NUMBER_PATTERN.match(line) and (at_edge or not line.isdigit()):
+            return True
+        return not re.search(r'[^\W_]', line)
+
+    def _normalize(self, line):
+        return re.sub(r'\s+', ' ', line).strip()
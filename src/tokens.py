@@ -0,0 +1,7 @@
+# Rough characters-per-token ratio for English text, used to budget prompts
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in text without calling the API"""
+    return len(text) // CHARS_PER_TOKEN + 1
@@ -0,0 +1,138 @@
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+
+class JobWorkspace:
+    """Per-job store for the upload, extracted images and the finished deck
+
+    Blobs are kept in memory until the job holds more than spill_threshold bytes;
+    anything stored after that goes to a job-scoped temporary directory. Names are
+    relative paths such as "images/pdf_page1_img1.png".
+    """
+
+    def __init__(self, spill_threshold=64 * 1024 * 1024, temp_root=None):
+        self.job_id = uuid.uuid4().hex
+        self.spill_threshold = spill_threshold
+        self.temp_root = temp_root
+        self.memory_bytes = 0
+        self._blobs = {}
+        self._paths = {}
+        self._temp_dir = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+    def __contains__(self, name):
+        return name in self._blobs or name in self._paths
+
+    def put(self, name, data):
+        """Store bytes (or any buffer) under name, spilling to disk above the threshold"""
+        size = memoryview(data).nbytes
+        with self._lock:
+            self._discard(name)
+            if self.memory_bytes + size <= self.spill_threshold:
+                self._blobs[name] = bytes(data)
+                self.memory_bytes += size
+                return
+            path = self._spill_path(name)
+        
+        with open(path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._paths[name] = path
+
+    @contextmanager
+    def writer(self, name):
+        """Yield a BytesIO whose contents are stored under name when the block exits"""
+        buffer = io.BytesIO()
+        buffer.name = name
+        yield buffer
+        self.put(name, buffer.getbuffer())
+
+    def open(self, name):
+        """Return a readable binary file object for name, carrying the name for format detection"""
+        if name in self._blobs:
+            stream = io.BytesIO(self._blobs[name])
+            stream.name = name
+            return stream
+        return open(self._paths[name], "rb")
+
+    def getbuffer(self, name):
+        """Return a memoryview over the blob; spilled blobs are memory-mapped, not read back in"""
+        if name in self._blobs:
+            return memoryview(self._blobs[name])
+        with open(self._paths[name], "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                return memoryview(b"")
+            # The mapping stays open for as long as the memoryview references it
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def size(self, name):
+        if name in self._blobs:
+            return len(self._blobs[name])
+        return os.path.getsize(self._paths[name])
+
+    def source(self, name):
+        """Return a real file path for spilled blobs, otherwise an in-memory stream"""
+        return self._paths.get(name) or self.open(name)
+
+    def path(self, name):
+        """Return a file path for name, writing in-memory blobs out for tools that need one"""
+        with self._lock:
+            if name in self._paths:
+                return self._paths[name]
+            data = self._blobs.pop(name)
+            self.memory_bytes -= len(data)
+            path = self._spill_path(name)
+        
+        with open(path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._paths[name] = path
+        return path
+
+    def keep(self, *names):
+        """Drop every blob except names, e.g. once a job only needs its output"""
+        with self._lock:
+            for name in set(self._blobs) | set(self._paths):
+                if name not in names:
+                    self._discard(name)
+
+    def cleanup(self):
+        """Drop all blobs and remove the job's temporary directory"""
+        with self._lock:
+            self._blobs.clear()
+            self._paths.clear()
+            self.memory_bytes = 0
+            temp_dir, self._temp_dir = self._temp_dir, None
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _discard(self, name):
+        data = self._blobs.pop(name, None)
+        if data is not None:
+            self.memory_bytes -= len(data)
+        path = self._paths.pop(name, None)
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _spill_path(self, name):
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix=f"job-{self.job_id}-", dir=self.temp_root)
+        path = os.path.join(self._temp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path